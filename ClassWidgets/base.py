@@ -1,6 +1,25 @@
+from PyQt5.QtCore import QCoreApplication, QTimer
 from PyQt5.QtWidgets import QWidget
+from contextlib import contextmanager
+import atexit
 import json
 import os
+import weakref
+
+# 修改配置后等待该时长(毫秒)再写入文件，合并连续的修改
+CONFIG_SAVE_DELAY_MS = 500
+
+# 有未写入修改的配置，退出时统一写入
+_unsaved_configs = weakref.WeakSet()
+
+# 配置文件路径 -> PluginConfig，同一进程内的所有组件共享
+_configs = {}
+
+
+@atexit.register
+def _flush_unsaved_configs():
+    for config in list(_unsaved_configs):
+        config.flush()
 
 class PluginBase:  # 插件类
     def __init__(self, cw_contexts, method):  # 初始化
@@ -24,12 +43,42 @@ class SettingsBase(QWidget):
         self.PATH = plugin_path
 
 
+def get_config(path, filename, default_config=None):
+    """获取配置文件对应的共享配置，首次获取时读取文件
+
+    各组件各自持有 PluginConfig 时，每个实例都会把自己(可能过时)的整份配置写回文件，
+    互相覆盖对方的修改，因此同一文件只创建一个实例。
+    default_config 中文件里没有的键会补上(只在内存中，下次写入时一并保存)。
+    """
+    key = os.path.normcase(os.path.abspath(os.path.join(path, filename)))
+    config = _configs.get(key)
+    if config is None:
+        config = _configs[key] = PluginConfig(path, filename)
+        config.load_config(dict(default_config or {}))
+    for name, value in (default_config or {}).items():
+        config.config.setdefault(name, value)
+    return config
+
+
 class PluginConfig:
-    def __init__(self, path, filename):
+    def __init__(self, path, filename, save_delay=CONFIG_SAVE_DELAY_MS):
         self.path = path
         self.filename = filename
         self.config = {}
         self.full_path = os.path.join(self.path, self.filename)
+        self.save_delay = save_delay  # 小于等于0时每次修改立即写入
+        self.dirty = False  # 是否有尚未写入文件的修改
+        self._stamp = None  # 最近一次读写后文件的 (mtime_ns, 大小)
+        self._saved_text = None  # 最近一次写入的内容
+        self._batch_depth = 0
+        self._timer = None
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.full_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     def load_config(self, default_config):
         if default_config is None:
@@ -39,17 +88,29 @@ class PluginConfig:
         if os.path.exists(self.full_path):
             with open(self.full_path, 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
+            self._stamp = self._file_stamp()
+            self.dirty = False
         else:
             self.config = default_config  # 如果文件不存在，使用默认配置
             self.save_config()
 
     def update_config(self):  # 更新配置
+        """从文件重新读取配置，文件自上次读写后未变化时直接返回
+
+        文件被其他程序修改时以文件内容为准，尚未写入的修改会被丢弃。
+        """
+        stamp = self._file_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return
         try:
             with open(self.full_path, 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
+            self._stamp = stamp
         except Exception as e:
             print(f'Error: {e}')
             self.config = {}
+        self.dirty = False
+        _unsaved_configs.discard(self)
 
     def upload_config(self, key=str or list, value=None):
         if type(key) == str:
@@ -59,18 +120,82 @@ class PluginConfig:
                 self.config[k] = value
         else:
             raise TypeError('key must be str or list (键的类型必须是字符串或列表)')
-        self.save_config()
+        self.mark_dirty()
 
     def save_config(self):
-        with open(self.full_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=4)
+        """立即写入配置(先写临时文件再替换，不会留下写了一半的文件)"""
+        if self._timer is not None:
+            self._timer.stop()
+        text = json.dumps(self.config, ensure_ascii=False, indent=4)
+        if text != self._saved_text or self._file_stamp() != self._stamp:
+            temp_path = f'{self.full_path}.{os.getpid()}.tmp'
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.full_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self._saved_text = text
+            self._stamp = self._file_stamp()
+        self.dirty = False
+        _unsaved_configs.discard(self)
+
+    def flush(self):
+        """有未写入的修改时立即写入"""
+        if not self.dirty:
+            return
+        try:
+            self.save_config()
+        except Exception as e:
+            print(f'Error: {e}')
+
+    def mark_dirty(self):
+        """标记配置已修改，延迟 save_delay 毫秒后写入，期间的修改合并为一次写入
+
+        直接修改 config 中的列表或字典后也应调用此方法。
+        """
+        self.dirty = True
+        _unsaved_configs.add(self)
+        if self._batch_depth:
+            return
+        if self.save_delay <= 0 or QCoreApplication.instance() is None:
+            self.flush()
+            return
+        if self._timer is None:
+            self._timer = QTimer()
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self.flush)
+        self._timer.start(self.save_delay)
+
+    @contextmanager
+    def batch(self):
+        """批量修改配置，结束时只写入一次
+
+        with config.batch():
+            config['a'] = 1
+            config['b'] = 2
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
 
     def __getitem__(self, key):
         return self.config.get(key)
 
     def __setitem__(self, key, value):
+        # 相同的值不再写入；同一个可变对象可能已被就地修改，仍视为修改
+        if key in self.config and self.config[key] is not value and self.config[key] == value:
+            return
         self.config[key] = value
-        self.save_config()
+        self.mark_dirty()
 
     def __repr__(self):
         return json.dumps(self.config, ensure_ascii=False, indent=4)
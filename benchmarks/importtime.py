@@ -0,0 +1,73 @@
+"""插件模块导入耗时报告
+
+在独立的子进程中以 python -X importtime 导入插件模块，
+汇总每个模块的累计导入耗时。插件以包的形式导入但不执行 __init__，
+因此可以单独测量不依赖 Qt 的 core 模块。
+
+用法：
+    python benchmarks/importtime.py                    # core 模块与 main
+    python benchmarks/importtime.py core.store --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "classroll_bench"
+DEFAULT_MODULES = ["core.sampler", "core.roster", "core.store", "core.history", "core.search", "core.simulation", "main"]
+
+# 子进程中执行：注册插件包(不执行 __init__)后导入目标模块
+IMPORT_CODE = """
+import sys, types
+package = types.ModuleType({package!r})
+package.__path__ = [{path!r}]
+sys.modules[{package!r}] = package
+import {package}.{module}
+"""
+
+
+def import_times(module):
+    """导入一个插件模块，返回 [(累计耗时微秒, 自身耗时微秒, 模块名)]，导入失败时返回错误信息"""
+    code = IMPORT_CODE.format(package=PACKAGE, path=PLUGIN_DIR, module=module)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, encoding="utf-8", errors="replace"
+    )
+    rows = []
+    errors = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            rows.append((int(fields[1]), int(fields[0]), fields[2].rstrip()))
+        except ValueError:
+            continue  # 表头
+    if result.returncode != 0:
+        return None, errors[-1] if errors else f"退出码 {result.returncode}"
+    return rows, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClassRoll Pro 模块导入耗时")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="插件内的模块名")
+    parser.add_argument("--top", type=int, default=8, help="每个模块列出耗时最多的依赖数")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        rows, error = import_times(module)
+        if rows is None:
+            print(f"{module:<16} 导入失败: {error}")
+            continue
+        target = f"{PACKAGE}.{module}"
+        total = next((cumulative for cumulative, _, name in rows if name.strip() == target), 0)
+        print(f"{module:<16} 累计 {total / 1000:>8.2f} ms, 共导入 {len(rows)} 个模块")
+        for cumulative, self_time, name in sorted(rows, reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:>8.2f} ms  (自身 {self_time / 1000:>6.2f} ms)  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""ClassRoll Pro 性能测试
+
+在无界面环境下(QT_QPA_PLATFORM=offscreen)测量名单读写、抽取、对话框填充、
+设置页构建和一次完整点名动画的耗时与内存峰值，结果保存为 JSON，
+并可与基准结果比较以发现性能退化。
+
+用法：
+    python benchmarks/run.py                              # 默认规模
+    python benchmarks/run.py --sizes 50 1000 --repeat 3
+    python benchmarks/run.py --save-baseline              # 保存为基准
+    python benchmarks/run.py --baseline benchmarks/baseline.json
+
+插件会被复制到临时目录中运行，不会改动真实的 names.txt 和配置文件。
+未安装 PyQt5/qfluentwidgets 时只运行不依赖 Qt 的测试。
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "classroll_bench"
+DEFAULT_SIZES = [50, 500, 5000, 20000, 100000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class StubMethod:
+    """模拟 Class Widgets 提供给插件的 method 对象，记录所有调用"""
+
+    def __init__(self):
+        self.calls = []
+        self.widgets = {}
+        self.on_content = None
+
+    def register_widget(self, widget_code, widget_name, widget_width):
+        self.calls.append("register_widget")
+        self.widgets.setdefault(widget_code, StubWidget())
+
+    def get_widget(self, widget_code):
+        self.calls.append("get_widget")
+        return self.widgets.get(widget_code)
+
+    def adjust_widget_width(self, widget_code, width):
+        self.calls.append("adjust_widget_width")
+
+    def change_widget_content(self, widget_code, title, content):
+        self.calls.append("change_widget_content")
+        widget = self.widgets.setdefault(widget_code, StubWidget())
+        widget._title, widget._content = title, content
+        if self.on_content:
+            self.on_content(title, content)
+
+    def send_notification(self, state=None, title=None, subtitle=None, content=None, duration=None, **kwargs):
+        self.calls.append("send_notification")
+
+
+class StubWidget:
+    def __init__(self):
+        self._title = ""
+        self._content = ""
+
+    def title(self):
+        return self._title
+
+    def content(self):
+        return self._content
+
+
+def make_roster(size, seed=0):
+    rng = random.Random(seed)
+    return [[f"学生{i:06d}", rng.choice([1, 2, 3, 3, 3, 4])] for i in range(size)]
+
+
+def copy_plugin(target):
+    """将插件复制到临时目录(不含名单、缓存与配置)"""
+    ignore = shutil.ignore_patterns(
+        ".git", "benchmarks", "__pycache__", "names.txt", ".*.cache", "config.json", "history.jsonl", "classroll.db*", "*.tmp"
+    )
+    shutil.copytree(PLUGIN_DIR, target, ignore=ignore, dirs_exist_ok=True)
+
+
+def load_package(plugin_copy):
+    """以包的形式导入插件副本，不执行 __init__ 以免提前导入 Qt"""
+    for name in [name for name in sys.modules if name == PACKAGE or name.startswith(PACKAGE + ".")]:
+        del sys.modules[name]
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [plugin_copy]
+    sys.modules[PACKAGE] = package
+    return package
+
+
+def measure(func, repeat, setup=None):
+    """运行 repeat 次计时，再单独运行一次统计 Python 内存峰值
+
+    返回耗时统计(毫秒)与内存峰值(KB)，计时时不开启 tracemalloc 以免影响结果。
+    """
+    def run():
+        state = setup() if setup else None
+        start = time.perf_counter()
+        func(state) if setup else func()
+        return (time.perf_counter() - start) * 1000
+
+    times = [run() for _ in range(repeat)]
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(times),
+        "min_ms": min(times),
+        "peak_kb": peak / 1024,
+    }
+
+
+def core_benchmarks(plugin_copy, size, repeat):
+    """不依赖 Qt 的测试"""
+    roster = importlib.import_module(PACKAGE + ".core.roster")
+    store_module = importlib.import_module(PACKAGE + ".core.store")
+    names_file = os.path.join(plugin_copy, "names.txt")
+    names_data = make_roster(size)
+    results = {}
+
+    results["save_names_to_file"] = measure(lambda: roster.save_names_to_file(names_file, names_data), repeat)
+
+    def drop_cache():
+        cache_path = roster.cache_path_for(names_file)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        return None
+
+    results["read_names_from_file.cold"] = measure(
+        lambda state: roster.read_names_from_file(names_file), repeat, setup=drop_cache
+    )
+    results["read_names_from_file.cached"] = measure(lambda: roster.read_names_from_file(names_file), repeat)
+
+    store_module._stores.clear()
+    store = store_module.get_store(names_file)
+    results["reset_shuffle"] = measure(store.reset_sampler, repeat)
+    results["get_next_name.x1000"] = measure(lambda: [store.draw() for _ in range(1000)], repeat)
+
+    simulation = importlib.import_module(PACKAGE + ".core.simulation")
+    results["simulate_pool"] = measure(lambda: simulation.simulate_pool(names_data), repeat)
+    return results
+
+
+def qt_benchmarks(plugin_copy, size, repeat, app):
+    """依赖 Qt 的测试：悬浮窗、概率对话框、设置页与完整点名动画"""
+    from PyQt5.QtCore import QEventLoop, QTimer
+
+    main = importlib.import_module(PACKAGE + ".main")
+    store_module = importlib.import_module(PACKAGE + ".core.store")
+    store_module._stores.clear()
+    results = {}
+
+    window = main.FloatingWindow()
+    window.store.ensure_loaded()  # 不等待后台加载
+    results["FloatingWindow.reset_shuffle"] = measure(window.reset_shuffle, repeat)
+    results["FloatingWindow.get_next_name.x1000"] = measure(
+        lambda: [window.get_next_name() for _ in range(1000)], repeat
+    )
+
+    dialog = main.ProbabilitySettingDialog(window.store)
+    results["ProbabilitySettingDialog.load_names"] = measure(dialog.load_names, repeat)
+    dialog.done(0)
+    dialog.deleteLater()
+
+    def drop_form_cache():
+        main._form_classes.clear()
+        cache_path = main.cache_path_for(os.path.join(plugin_copy, "settings.ui"))
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    results["Settings.__init__.cold"] = measure(
+        lambda state: main.Settings(plugin_copy).deleteLater(), repeat, setup=drop_form_cache
+    )
+    results["Settings.__init__"] = measure(lambda: main.Settings(plugin_copy).deleteLater(), repeat)
+    window.close()
+    window.deleteLater()
+
+    def animation_cycle():
+        method = StubMethod()
+        plugin = main.Plugin({"PLUGIN_PATH": plugin_copy}, method)
+        loop = QEventLoop()
+
+        def on_content(title, content):
+            if title == "点名结果":
+                QTimer.singleShot(0, loop.quit)
+
+        method.on_content = on_content
+        plugin.show_name_in_widget(window.store.names[0] if window.store.names else "名单为空")
+        QTimer.singleShot(30000, loop.quit)
+        loop.exec_()
+        plugin.floating_window.close()
+        return len(method.calls)
+
+    host_calls = []
+    results["Plugin.show_name_in_widget.cycle"] = measure(
+        lambda: host_calls.append(animation_cycle()), max(1, min(repeat, 2))
+    )
+    results["Plugin.show_name_in_widget.cycle"]["host_calls"] = host_calls[-1] if host_calls else 0
+    return results
+
+
+def compare(results, baseline, threshold):
+    """与基准比较，返回退化项列表"""
+    reference = {(item["name"], item["size"]): item for item in baseline.get("results", [])}
+    regressions = []
+    for item in results:
+        base = reference.get((item["name"], item["size"]))
+        if not base or base["median_ms"] <= 0:
+            continue
+        ratio = item["median_ms"] / base["median_ms"]
+        item["baseline_ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append((item["name"], item["size"], base["median_ms"], item["median_ms"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClassRoll Pro 性能测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="名单规模")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测试的重复次数")
+    parser.add_argument("--output", default=None, help="结果 JSON 路径")
+    parser.add_argument("--baseline", default=None, help="用于比较的基准 JSON 路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基准")
+    parser.add_argument("--threshold", type=float, default=0.25, help="判定为退化的耗时增幅")
+    parser.add_argument("--no-qt", action="store_true", help="只运行不依赖 Qt 的测试")
+    args = parser.parse_args()
+
+    app = None
+    if not args.no_qt:
+        try:
+            from PyQt5.QtWidgets import QApplication
+            import qfluentwidgets  # noqa: F401
+            app = QApplication.instance() or QApplication(sys.argv)
+        except ImportError as e:
+            print(f"未安装 Qt 依赖，跳过界面相关测试: {e}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        plugin_copy = os.path.join(temp_dir, "plugin")
+        copy_plugin(plugin_copy)
+        for size in args.sizes:
+            load_package(plugin_copy)
+            measured = core_benchmarks(plugin_copy, size, args.repeat)
+            if app is not None:
+                measured.update(qt_benchmarks(plugin_copy, size, args.repeat, app))
+            for name, stats in measured.items():
+                results.append(dict(name=name, size=size, **stats))
+                print(f"{name:<40} n={size:<7} {stats['median_ms']:>10.2f} ms  峰值 {stats['peak_kb']:>10.1f} KB")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qt": app is not None,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    baseline_path = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    if baseline_path and not args.save_baseline:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, size, before, after, ratio in regressions:
+            print(f"性能退化: {name} n={size} {before:.2f} ms -> {after:.2f} ms ({ratio:.2f}x)")
+        exit_code = 1 if regressions else 0
+
+    output = DEFAULT_BASELINE if args.save_baseline else args.output
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"结果已保存到 {output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""ClassRoll Pro 核心逻辑（不依赖 Qt）"""
@@ -0,0 +1,26 @@
+"""点名动画的帧时间表"""
+import random
+
+# 第一帧延迟与每帧递增的延迟(毫秒)，动画逐渐减慢
+FRAME_BASE_MS = 80
+FRAME_STEP_MS = 20
+
+
+def frame_schedule(filler_count, base=FRAME_BASE_MS, step=FRAME_STEP_MS):
+    """返回 filler_count 个过渡帧加最终结果帧的出现时刻(相对动画开始，毫秒)
+
+    第 k 帧与上一帧的间隔为 base + step * k，与原先逐帧重设计时器的节奏一致。
+    """
+    due_times = []
+    elapsed = 0
+    for k in range(filler_count + 1):
+        elapsed += base + step * k
+        due_times.append(elapsed)
+    return due_times
+
+
+def build_frames(names, final_name, filler_count, rng=None):
+    """预先生成整段动画：(出现时刻列表, 每帧显示的名字列表)，最后一帧为最终结果"""
+    rng = rng or random
+    fillers = rng.choices(names, k=filler_count) if names else [final_name] * filler_count
+    return frame_schedule(filler_count), fillers + [final_name]
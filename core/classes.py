@@ -0,0 +1,22 @@
+"""多班级名单：默认名单文件加名单目录中每个班级一个文件"""
+import os
+
+# 名单目录(位于插件目录下)，其中每个 .txt 文件是一个班级，文件名即班级名
+ROSTER_DIR = "rosters"
+ROSTER_SUFFIX = ".txt"
+
+# 原有的 names.txt 作为默认班级
+DEFAULT_CLASS = "默认班级"
+
+
+def list_classes(default_path, directory):
+    """返回 {班级名: 名单文件路径}，默认班级在最前，其余按名称排序"""
+    classes = {DEFAULT_CLASS: default_path}
+    try:
+        entries = sorted(entry.name for entry in os.scandir(directory)
+                         if entry.is_file() and entry.name.endswith(ROSTER_SUFFIX))
+    except OSError:
+        return classes
+    for filename in entries:
+        classes.setdefault(filename[:-len(ROSTER_SUFFIX)], os.path.join(directory, filename))
+    return classes
@@ -0,0 +1,310 @@
+"""可选的 SQLite 名单与点名记录存储，适合全校规模(数万学生、数百个班级)的部署
+
+数据库使用 WAL 模式，读取与写入互不阻塞，多个进程可以同时读取。
+名单加载、按班级或等级筛选、"被点到最多/最少"查询都走索引。
+所有 SQL 均为固定语句(由 sqlite3 缓存预编译结果)，批量操作使用 executemany。
+
+命令行用法(在插件目录下运行)：
+    python -m core.database classroll.db import 高一1班 rosters/高一1班.txt
+    python -m core.database classroll.db export 高一1班 高一1班.txt
+    python -m core.database classroll.db classes
+    python -m core.database classroll.db most 高一1班 --limit 5
+"""
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from .roster import atomic_write, format_roster_text, normalize_names, parse_roster_text
+from .sampler import PROBABILITY_WEIGHTS
+
+SCHEMA_VERSION = 1
+
+TIER_LABELS = {1: "不可能", 2: "小概率", 3: "普通", 4: "大概率", 5: "绝对"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tiers (
+    tier INTEGER PRIMARY KEY,
+    label TEXT NOT NULL,
+    weight INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    tier INTEGER NOT NULL REFERENCES tiers(tier),
+    draw_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS students_by_position ON students(class_id, position);
+CREATE INDEX IF NOT EXISTS students_by_name ON students(class_id, name);
+CREATE INDEX IF NOT EXISTS students_by_tier ON students(class_id, tier);
+CREATE INDEX IF NOT EXISTS students_by_draw_count ON students(class_id, draw_count);
+CREATE TABLE IF NOT EXISTS draws (
+    id INTEGER PRIMARY KEY,
+    student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS draws_by_student ON draws(student_id, time);
+"""
+
+SELECT_CLASS_ID = "SELECT id FROM classes WHERE name = ?"
+INSERT_CLASS = "INSERT INTO classes (name) VALUES (?)"
+SELECT_ROSTER = (
+    "SELECT name, tier FROM students "
+    "WHERE class_id = (SELECT id FROM classes WHERE name = ?) ORDER BY position"
+)
+SELECT_STUDENT_IDS = "SELECT id, name FROM students WHERE class_id = ? ORDER BY position"
+SELECT_BY_TIER = (
+    "SELECT name FROM students "
+    "WHERE class_id = (SELECT id FROM classes WHERE name = ?) AND tier = ? ORDER BY position"
+)
+DELETE_STUDENT = "DELETE FROM students WHERE id = ?"
+UPDATE_STUDENT = "UPDATE students SET position = ?, tier = ? WHERE id = ?"
+UPDATE_TIER = "UPDATE students SET tier = ? WHERE class_id = ? AND position = ?"
+INSERT_STUDENT = "INSERT INTO students (class_id, position, name, tier) VALUES (?, ?, ?, ?)"
+FIRST_STUDENT = "SELECT id FROM students WHERE class_id = ? AND name = ? ORDER BY position LIMIT 1"
+COUNT_DRAW = "UPDATE students SET draw_count = draw_count + 1 WHERE id = ?"
+INSERT_DRAW = "INSERT INTO draws (student_id, time) VALUES (?, ?)"
+MOST_CALLED = (
+    "SELECT name, draw_count FROM students "
+    "WHERE class_id = (SELECT id FROM classes WHERE name = ?) ORDER BY draw_count DESC, position LIMIT ?"
+)
+LEAST_CALLED = (
+    "SELECT name, draw_count FROM students "
+    "WHERE class_id = (SELECT id FROM classes WHERE name = ?) ORDER BY draw_count, position LIMIT ?"
+)
+
+
+class RosterDatabase:
+    """SQLite 名单库：班级、学生、概率等级与点名记录
+
+    每个线程使用各自的连接(后台加载名单时不与界面线程共用连接)，
+    写入在 BEGIN IMMEDIATE 事务中进行。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._write_lock = threading.Lock()
+
+        connection = self.connection()
+        if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        with self.transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO tiers (tier, label, weight) VALUES (?, ?, ?)",
+                [(tier, TIER_LABELS[tier], weight) for tier, weight in PROBABILITY_WEIGHTS.items()]
+            )
+
+    def connection(self):
+        """当前线程的连接"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+            self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """写事务，出错时回滚"""
+        connection = self.connection()
+        with self._write_lock:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+        self._local = threading.local()
+
+    def class_names(self):
+        """所有班级名，按名称排序"""
+        return [row[0] for row in self.connection().execute("SELECT name FROM classes ORDER BY name")]
+
+    @staticmethod
+    def _class_id(connection, class_name, create=False):
+        row = connection.execute(SELECT_CLASS_ID, (class_name,)).fetchone()
+        if row:
+            return row[0]
+        return connection.execute(INSERT_CLASS, (class_name,)).lastrowid if create else None
+
+    def load_roster(self, class_name):
+        """按原顺序读取班级名单 [[名字, 概率等级], ...]，班级不存在时返回空列表"""
+        return [[name, tier] for name, tier in self.connection().execute(SELECT_ROSTER, (class_name,))]
+
+    def save_roster(self, class_name, names_data, dirty_rows=None):
+        """在一个事务中保存班级名单，返回与 save_roster(文本) 相同格式的统计信息
+
+        按名字对齐已有学生，保留其 id 与点名记录；dirty_rows 为仅概率等级变化的行号，
+        提供时只更新这些行。
+        """
+        start = time.perf_counter()
+        names_data = normalize_names(names_data)
+        with self.transaction() as connection:
+            class_id = self._class_id(connection, class_name, create=True)
+            if dirty_rows is not None:
+                connection.executemany(UPDATE_TIER, [(names_data[row][1], class_id, row) for row in dirty_rows])
+            else:
+                existing = {}
+                for student_id, name in connection.execute(SELECT_STUDENT_IDS, (class_id,)):
+                    existing.setdefault(name, []).append(student_id)
+                updates = []
+                inserts = []
+                for position, (name, tier) in enumerate(names_data):
+                    ids = existing.get(name)
+                    if ids:
+                        updates.append((position, tier, ids.pop(0)))
+                    else:
+                        inserts.append((class_id, position, name, tier))
+                connection.executemany(DELETE_STUDENT, [(student_id,) for ids in existing.values() for student_id in ids])
+                connection.executemany(UPDATE_STUDENT, updates)
+                connection.executemany(INSERT_STUDENT, inserts)
+        elapsed = (time.perf_counter() - start) * 1000
+        return {
+            "rows": len(names_data),
+            "dirty_rows": len(dirty_rows) if dirty_rows is not None else None,
+            "bytes": None,
+            "write_ms": elapsed,
+            "total_ms": elapsed,
+            "cache_patched": False,
+        }
+
+    def delete_class(self, class_name):
+        """删除班级及其学生和点名记录"""
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM classes WHERE name = ?", (class_name,))
+
+    def students_in_tier(self, class_name, tier):
+        """班级中某一概率等级的学生"""
+        return [row[0] for row in self.connection().execute(SELECT_BY_TIER, (class_name, tier))]
+
+    def record_draws(self, class_name, names, timestamp=None):
+        """记录一次或批量点名，名单中不存在的名字被忽略"""
+        if not names:
+            return
+        timestamp = timestamp or time.time()
+        with self.transaction() as connection:
+            class_id = self._class_id(connection, class_name)
+            if class_id is None:
+                return
+            rows = [connection.execute(FIRST_STUDENT, (class_id, name)).fetchone() for name in names]
+            student_ids = [row[0] for row in rows if row]
+            connection.executemany(COUNT_DRAW, [(student_id,) for student_id in student_ids])
+            connection.executemany(INSERT_DRAW, [(student_id, timestamp) for student_id in student_ids])
+
+    def most_called(self, class_name, limit=10):
+        """被点到次数最多的学生 [(名字, 次数)]"""
+        return self.connection().execute(MOST_CALLED, (class_name, limit)).fetchall()
+
+    def least_called(self, class_name, limit=10):
+        """被点到次数最少的学生 [(名字, 次数)]"""
+        return self.connection().execute(LEAST_CALLED, (class_name, limit)).fetchall()
+
+    def import_text(self, class_name, file_path):
+        """导入 名字,概率等级 格式的名单文件，返回导入的人数"""
+        with open(file_path, "rb") as f:
+            names_data = parse_roster_text(f.read().decode("utf-8")).to_list()
+        self.save_roster(class_name, names_data)
+        return len(names_data)
+
+    def export_text(self, class_name, file_path):
+        """导出为 名字,概率等级 格式的名单文件，返回导出的人数"""
+        names_data = self.load_roster(class_name)
+        atomic_write(file_path, format_roster_text(names_data))
+        return len(names_data)
+
+
+class DatabaseRosterSource:
+    """RosterStore 的数据库名单来源(对应 TextRosterSource)
+
+    database 也可以是返回 RosterDatabase 的函数，数据库在第一次读写时才打开，
+    这样首次打开(建表、导入文本名单)可以在后台加载名单时进行。
+    """
+
+    def __init__(self, database, class_name):
+        self._database = database
+        self.class_name = class_name
+
+    @property
+    def database(self):
+        if not isinstance(self._database, RosterDatabase):
+            self._database = self._database()
+        return self._database
+
+    def read(self):
+        try:
+            return self.database.load_roster(self.class_name)
+        except sqlite3.Error as e:
+            print(f"读取名单数据库时出错: {e}")
+            return []
+
+    def save(self, names_data, dirty_rows=None):
+        try:
+            return self.database.save_roster(self.class_name, names_data, dirty_rows)
+        except sqlite3.Error as e:
+            print(f"保存名单数据库时出错: {e}")
+            return None
+
+    def record_draws(self, names):
+        try:
+            self.database.record_draws(self.class_name, names)
+        except sqlite3.Error as e:
+            print(f"写入点名记录时出错: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ClassRoll Pro 名单数据库")
+    parser.add_argument("database", help="数据库文件路径")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("import", help="导入文本名单")
+    command.add_argument("class_name")
+    command.add_argument("file")
+    command = commands.add_parser("export", help="导出为文本名单")
+    command.add_argument("class_name")
+    command.add_argument("file")
+    commands.add_parser("classes", help="列出班级")
+    for name, help_text in (("most", "被点到最多的学生"), ("least", "被点到最少的学生")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("class_name")
+        command.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    database = RosterDatabase(args.database)
+    try:
+        if args.command == "import":
+            print(f"已导入 {database.import_text(args.class_name, args.file)} 人")
+        elif args.command == "export":
+            print(f"已导出 {database.export_text(args.class_name, args.file)} 人")
+        elif args.command == "classes":
+            for class_name in database.class_names():
+                print(class_name)
+        else:
+            query = database.most_called if args.command == "most" else database.least_called
+            for name, count in query(args.class_name, args.limit):
+                print(f"{name}\t{count}")
+    finally:
+        database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""点名历史记录：内存中的环形缓冲 + 追加写入的 JSONL 日志"""
+import json
+import os
+import time
+
+from .roster import atomic_write
+
+# 内存中保留的最近记录条数
+RECENT_LIMIT = 1000
+
+# 日志中超出内存记录的行数达到该值时压缩日志
+COMPACT_LINES = 5000
+
+# 记录类型：单个学生(计入次数统计)与分组结果
+KIND_NAME = "name"
+KIND_TEAM = "team"
+
+# 日志文件路径 -> DrawHistory，同一进程内的所有组件共享
+_histories = {}
+
+
+def get_history(log_path):
+    """获取日志文件对应的共享历史记录"""
+    key = os.path.normcase(os.path.abspath(log_path))
+    history = _histories.get(key)
+    if history is None:
+        history = _histories[key] = DrawHistory(log_path)
+    return history
+
+
+def format_team(index, team):
+    """分组结果在历史记录中的显示文本"""
+    return f"第{index}组: " + "、".join(item[0] for item in team)
+
+
+class HistoryRing:
+    """固定容量的环形缓冲，追加与按位置读取均为 O(1)，写满后覆盖最早的元素"""
+
+    def __init__(self, capacity):
+        self.items = [None] * max(1, capacity)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        """从最早到最新"""
+        for offset in range(self.size):
+            yield self.items[(self.start + offset) % len(self.items)]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("history index out of range")
+        return self.items[(self.start + index) % len(self.items)]
+
+    def append(self, item):
+        capacity = len(self.items)
+        if self.size < capacity:
+            self.items[(self.start + self.size) % capacity] = item
+            self.size += 1
+        else:
+            self.items[self.start] = item
+            self.start = (self.start + 1) % capacity
+
+    def newest(self, offset, count):
+        """从最新的记录往前数，跳过 offset 条后的 count 条"""
+        end = max(0, self.size - offset)
+        return [self[index] for index in range(end - 1, max(0, end - count) - 1, -1)]
+
+    def clear(self):
+        self.items = [None] * len(self.items)
+        self.start = 0
+        self.size = 0
+
+
+class DrawHistory:
+    """点名历史：最近的记录保存在环形缓冲中，全部记录追加写入日志文件
+
+    每条记录为 (序号, 时间戳, 类型, 文本)。另外按学生维护被点到的次数和
+    最近一次的序号与时间，查询均为 O(1)。日志过长时压缩为一行统计快照
+    加内存中的最近记录，次数统计不受压缩影响。
+    """
+
+    def __init__(self, log_path=None, limit=RECENT_LIMIT, compact_lines=COMPACT_LINES):
+        self.log_path = log_path
+        self.compact_lines = compact_lines
+        self.recent = HistoryRing(limit)
+        self.seq = 0
+        self.counts = {}  # 名字 -> 被点到的次数
+        self.last_seq = {}  # 名字 -> 最近一次被点到的记录序号
+        self.last_time = {}  # 名字 -> 最近一次被点到的时间戳
+        self.log_lines = 0
+        self._log_file = None
+        if log_path:
+            self.load()
+
+    def __len__(self):
+        return len(self.recent)
+
+    def __iter__(self):
+        """最近记录的文本，从最早到最新"""
+        return (entry[3] for entry in self.recent)
+
+    def __reversed__(self):
+        return (self.recent[index][3] for index in range(len(self.recent) - 1, -1, -1))
+
+    def load(self):
+        """从日志恢复历史，无法解析的行被跳过
+
+        写入中断留下的半行(文件末尾没有换行)会被截掉，
+        否则之后追加的第一条记录会接在半行后面，一同无法解析。
+        """
+        try:
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"读取点名历史时出错: {e}")
+            return
+
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            data = data[:complete]
+            try:
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(complete)
+            except OSError as e:
+                print(f"截断点名历史时出错: {e}")
+        lines = data.splitlines()
+
+        counted_seq = 0  # 快照已统计到的序号，之后的最近记录不再重复计数
+        for line in lines:
+            try:
+                record = json.loads(line)
+                if record.get("kind") == "snapshot":
+                    self.seq = counted_seq = record["seq"]
+                    self.counts = record["counts"]
+                    self.last_seq = record["last_seq"]
+                    self.last_time = record["last_time"]
+                else:
+                    entry = (record["seq"], record["time"], record["kind"], record["text"])
+                    if entry[0] <= counted_seq:
+                        self.recent.append(entry)
+                    else:
+                        self._apply(entry)
+            except (ValueError, KeyError, TypeError):
+                continue
+        self.log_lines = len(lines)
+
+    def _apply(self, entry):
+        seq, timestamp, kind, text = entry
+        self.seq = max(self.seq, seq)
+        self.recent.append(entry)
+        if kind == KIND_NAME:
+            self.counts[text] = self.counts.get(text, 0) + 1
+            self.last_seq[text] = seq
+            self.last_time[text] = timestamp
+
+    def _add(self, kind, texts):
+        entries = []
+        now = time.time()
+        for text in texts:
+            self.seq += 1
+            entry = (self.seq, now, kind, text)
+            self._apply(entry)
+            entries.append(entry)
+        self._append_log(entries)
+
+    def _append_log(self, entries):
+        """把新记录追加到日志末尾，超出阈值时压缩"""
+        if not self.log_path or not entries:
+            return
+        try:
+            if self._log_file is None:
+                self._log_file = open(self.log_path, "a", encoding="utf-8")
+            self._log_file.write("".join(self._format(entry) for entry in entries))
+            self._log_file.flush()
+            self.log_lines += len(entries)
+        except OSError as e:
+            print(f"写入点名历史时出错: {e}")
+            return
+        if self.log_lines > len(self.recent) + self.compact_lines:
+            self.compact()
+
+    @staticmethod
+    def _format(entry):
+        seq, timestamp, kind, text = entry
+        return json.dumps({"seq": seq, "time": timestamp, "kind": kind, "text": text}, ensure_ascii=False) + "\n"
+
+    def compact(self):
+        """把日志改写为统计快照加最近记录(原子替换)"""
+        if not self.log_path:
+            return
+        self.close()
+        snapshot = {
+            "kind": "snapshot",
+            "seq": self.seq,
+            "counts": self.counts,
+            "last_seq": self.last_seq,
+            "last_time": self.last_time,
+        }
+        data = json.dumps(snapshot, ensure_ascii=False) + "\n" + "".join(self._format(entry) for entry in self.recent)
+        try:
+            atomic_write(self.log_path, data.encode("utf-8"))
+            self.log_lines = 1 + len(self.recent)
+        except OSError as e:
+            print(f"压缩点名历史时出错: {e}")
+
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    def record(self, name):
+        """记录一次点名"""
+        self._add(KIND_NAME, [name])
+
+    def record_many(self, names):
+        """记录批量点名的结果"""
+        self._add(KIND_NAME, names)
+
+    def record_teams(self, teams):
+        """记录分组结果，每组一条，不计入学生的点名次数"""
+        self._add(KIND_TEAM, [format_team(index, team) for index, team in enumerate(teams, 1)])
+
+    def page(self, number, size):
+        """第 number 页(从0开始)的记录，最新的在前"""
+        return self.recent.newest(number * size, size)
+
+    def count(self, name):
+        """学生被点到的次数"""
+        return self.counts.get(name, 0)
+
+    def last_called(self, name):
+        """学生最近一次被点到的时间戳，从未被点到时返回 None"""
+        return self.last_time.get(name)
+
+    def draws_since(self, name):
+        """学生最近一次被点到之后又有多少条记录，从未被点到时返回 None"""
+        seq = self.last_seq.get(name)
+        return None if seq is None else self.seq - seq
+
+    def clear(self):
+        """清空全部历史(例如新学期开始)"""
+        self.close()
+        self.recent.clear()
+        self.seq = 0
+        self.counts = {}
+        self.last_seq = {}
+        self.last_time = {}
+        self.log_lines = 0
+        if self.log_path and os.path.exists(self.log_path):
+            try:
+                atomic_write(self.log_path, b"")
+            except OSError as e:
+                print(f"清空点名历史时出错: {e}")
@@ -0,0 +1,185 @@
+"""从 CSV、Excel(.xlsx) 或 GBK 编码的文本文件流式导入名单
+
+文件逐行读取，不会一次性读入内存；编码根据文件开头判断，
+名字列和概率列根据表头识别。每行在读取时校验并去重，
+结果交给名单仓库一次性保存。
+"""
+import codecs
+import csv
+import io
+import os
+import sys
+
+from .roster import DEFAULT_PROBABILITY
+
+# 名字列与概率列的常见表头(小写比较)
+NAME_HEADERS = ("姓名", "名字", "学生姓名", "学生", "name")
+TIER_HEADERS = ("概率等级", "概率", "等级", "tier", "probability")
+
+# 用于判断编码和分隔符的文件开头字节数
+SAMPLE_BYTES = 64 * 1024
+
+# 判断分隔符时使用的行数
+SNIFF_LINES = 20
+
+# 每处理这么多行报告一次进度并检查是否取消
+PROGRESS_ROWS = 1000
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+
+# 名字中不允许出现的字符：名单文件每行保存为"名字,概率等级"，
+# 逗号或换行会破坏这一格式；"�" 表示解码失败
+INVALID_NAME_CHARS = (",", "\n", "\r", "\ufffd")
+
+
+class ImportCancelled(Exception):
+    """导入被取消"""
+
+
+def detect_encoding(sample):
+    """根据文件开头的字节判断编码：带 BOM 的 UTF-8/UTF-16、UTF-8，否则按 GB18030(兼容 GBK) 处理"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # 样本末尾可能截断了多字节字符，不作为错误
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def sniff_delimiter(text):
+    """判断分隔符(逗号、制表符、分号或中文逗号)，无法判断时为逗号"""
+    lines = "\n".join(text.splitlines()[:SNIFF_LINES])
+    try:
+        return csv.Sniffer().sniff(lines, delimiters=",\t;，").delimiter
+    except csv.Error:
+        return ","
+
+
+def map_columns(row):
+    """根据第一行识别列：返回 (名字列, 概率列, 第一行是否为表头)
+
+    没有可识别的表头时，第一列为名字、第二列为概率等级。
+    """
+    cells = [cell.strip().lower() for cell in row]
+    name_column = next((index for index, cell in enumerate(cells) if cell in NAME_HEADERS), None)
+    if name_column is None:
+        return 0, 1, False
+    tier_column = next((index for index, cell in enumerate(cells) if cell in TIER_HEADERS), None)
+    return name_column, tier_column, True
+
+
+def parse_tier(text):
+    """解析概率等级并限制在1-5范围内，无法解析时返回 None"""
+    try:
+        return max(1, min(5, int(float(text))))
+    except (TypeError, ValueError):
+        return None
+
+
+def _cell_text(value):
+    """Excel 单元格的文本，整数值的浮点数(例如 3.0)按整数处理"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class RosterImporter:
+    """流式读取名单文件，逐行校验、去重，得到 [名字, 概率等级] 列表
+
+    name_column/tier_column 可指定列号，默认根据表头识别；
+    existing_names 中的名字视为重复(追加到已有名单时使用)。
+    """
+
+    def __init__(self, path, encoding=None, name_column=None, tier_column=None, existing_names=()):
+        self.path = path
+        self.encoding = encoding
+        self.name_column = name_column
+        self.tier_column = tier_column
+        self.existing_names = existing_names
+        self.stats = {"rows": 0, "imported": 0, "duplicates": 0, "invalid": 0, "bad_tiers": 0, "encoding": None}
+
+    def rows(self):
+        """逐行产生 (单元格列表, 已读取的比例)"""
+        if self.path.lower().endswith(EXCEL_SUFFIXES):
+            return self._excel_rows()
+        return self._text_rows()
+
+    def _text_rows(self):
+        size = os.path.getsize(self.path) or 1
+        with open(self.path, "rb") as raw:
+            sample = raw.read(SAMPLE_BYTES)
+            encoding = self.encoding or detect_encoding(sample)
+            self.stats["encoding"] = encoding
+            delimiter = sniff_delimiter(sample.decode(encoding, errors="ignore"))
+            raw.seek(0)
+            text = io.TextIOWrapper(raw, encoding=encoding, errors="replace", newline="")
+            for row in csv.reader(text, delimiter=delimiter):
+                yield row, raw.tell() / size
+
+    def _excel_rows(self):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportError("导入 Excel 文件需要安装 openpyxl") from None
+
+        self.stats["encoding"] = "xlsx"
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            total = sheet.max_row or 0
+            for index, row in enumerate(sheet.iter_rows(values_only=True), 1):
+                yield [_cell_text(value) for value in row], index / total if total else 0
+        finally:
+            workbook.close()
+
+    def run(self, progress=None, cancelled=None):
+        """执行导入并返回名单
+
+        progress(百分比) 用于报告进度；cancelled() 返回 True 时抛出 ImportCancelled。
+        """
+        stats = self.stats
+        names_data = []
+        seen = set(self.existing_names)
+        name_column, tier_column = self.name_column, self.tier_column
+        for count, (row, fraction) in enumerate(self.rows()):
+            if count % PROGRESS_ROWS == 0:
+                if cancelled and cancelled():
+                    raise ImportCancelled()
+                if progress:
+                    progress(int(fraction * 100))
+            if count == 0:
+                detected_name, detected_tier, is_header = map_columns(row)
+                name_column = detected_name if name_column is None else name_column
+                tier_column = detected_tier if tier_column is None else tier_column
+                if is_header:
+                    continue
+            if not any(cell.strip() for cell in row):
+                continue
+
+            stats["rows"] += 1
+            name = row[name_column].strip() if name_column < len(row) else ""
+            if not name or any(char in name for char in INVALID_NAME_CHARS):
+                stats["invalid"] += 1
+                continue
+            if name in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(name)
+
+            tier_text = row[tier_column].strip() if tier_column is not None and tier_column < len(row) else ""
+            tier = parse_tier(tier_text) if tier_text else DEFAULT_PROBABILITY
+            if tier is None:
+                stats["bad_tiers"] += 1
+                tier = DEFAULT_PROBABILITY
+            names_data.append([sys.intern(name), tier])
+
+        stats["imported"] = len(names_data)
+        if progress:
+            progress(100)
+        return names_data
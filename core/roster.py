@@ -0,0 +1,285 @@
+"""名单文件的读取、保存与二进制缓存"""
+import hashlib
+import os
+import struct
+import sys
+import time
+
+# 默认概率等级(普通)
+DEFAULT_PROBABILITY = 3
+
+# 缓存文件格式：文件头 + 每人1字节的概率等级 + 以换行分隔的 UTF-8 名字
+CACHE_MAGIC = b"CRPC"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sHIqq20s")  # 标识, 版本, 人数, 源文件 mtime_ns, 源文件大小, 源文件 SHA-1
+
+
+class Roster:
+    """按列存储的名单：名字列表 + 概率等级字节数组"""
+
+    __slots__ = ("names", "tiers")
+
+    def __init__(self, names=(), tiers=()):
+        self.names = list(names)
+        self.tiers = bytearray(tiers)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_list(cls, names_data):
+        """由 [名字, 概率等级] 列表创建"""
+        return cls([item[0] for item in names_data], [item[1] for item in names_data])
+
+    def to_list(self):
+        """转换为 [名字, 概率等级] 列表"""
+        return [[name, tier] for name, tier in zip(self.names, self.tiers)]
+
+
+def diff_rosters(old_data, new_data):
+    """比较两份名单，返回 (新增, 删除, 概率等级变化) 三个列表
+
+    新增与等级变化的元素为 [名字, 新等级]，删除的元素为名字。
+    名单中有重名时无法按名字对齐，返回 None。
+    """
+    old_tiers = {item[0]: item[1] for item in old_data}
+    new_tiers = {item[0]: item[1] for item in new_data}
+    if len(old_tiers) != len(old_data) or len(new_tiers) != len(new_data):
+        return None
+
+    added = [[name, tier] for name, tier in new_tiers.items() if name not in old_tiers]
+    removed = [name for name in old_tiers if name not in new_tiers]
+    retiered = [[name, tier] for name, tier in new_tiers.items()
+                if name in old_tiers and old_tiers[name] != tier]
+    return added, removed, retiered
+
+
+def parse_roster_text(text):
+    """解析名单文本，每行格式为 名字,概率等级"""
+    names = []
+    tiers = bytearray()
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+
+        parts = line.split(',')
+        name = parts[0].strip()
+        if not name:
+            continue
+
+        # 尝试获取概率等级，默认为3(普通)
+        try:
+            probability = int(parts[1].strip()) if len(parts) > 1 else DEFAULT_PROBABILITY
+            # 确保概率在1-5范围内
+            probability = max(1, min(5, probability))
+        except:
+            probability = DEFAULT_PROBABILITY
+
+        names.append(sys.intern(name))
+        tiers.append(probability)
+    return Roster(names, tiers)
+
+
+def cache_path_for(file_path):
+    """名单文件对应的缓存文件路径"""
+    directory, filename = os.path.split(file_path)
+    return os.path.join(directory, f".{filename}.cache")
+
+
+def _read_cache(cache_path, stat, source_bytes=None):
+    """读取缓存；源文件未变化时返回 Roster，否则返回 None
+
+    mtime 与大小一致时直接使用缓存；
+    不一致但提供了源文件内容且哈希一致(例如文件只是被"触碰")时同样使用缓存。
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if len(data) < CACHE_HEADER.size:
+        return None
+    magic, version, count, mtime_ns, size, digest = CACHE_HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None
+
+    if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+        if source_bytes is None or hashlib.sha1(source_bytes).digest() != digest:
+            return None
+
+    view = memoryview(data)
+    tiers_end = CACHE_HEADER.size + count
+    tiers = view[CACHE_HEADER.size:tiers_end]
+    names = str(view[tiers_end:], "utf-8").split("\n") if count else []
+    if len(names) != count:
+        return None
+    return Roster([sys.intern(name) for name in names], tiers)
+
+
+def _write_cache(cache_path, stat, source_bytes, roster):
+    """写入缓存(先写临时文件再替换)，失败时忽略"""
+    header = CACHE_HEADER.pack(
+        CACHE_MAGIC,
+        CACHE_VERSION,
+        len(roster),
+        stat.st_mtime_ns,
+        stat.st_size,
+        hashlib.sha1(source_bytes).digest()
+    )
+    temp_path = cache_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(header + bytes(roster.tiers) + "\n".join(roster.names).encode("utf-8"))
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"写入名单缓存时出错: {e}")
+
+
+def load_roster(file_path):
+    """读取名单，优先使用与名单文件同目录的二进制缓存
+
+    名单文本文件始终是唯一的数据来源，缓存只在源文件未变化时使用。
+    """
+    stat = os.stat(file_path)
+    cache_path = cache_path_for(file_path)
+
+    roster = _read_cache(cache_path, stat)
+    if roster is not None:
+        return roster
+
+    with open(file_path, "rb") as f:
+        source_bytes = f.read()
+    roster = _read_cache(cache_path, stat, source_bytes)
+    if roster is None:
+        roster = parse_roster_text(source_bytes.decode("utf-8"))
+    _write_cache(cache_path, stat, source_bytes, roster)
+    return roster
+
+
+def read_names_from_file(file_path):
+    """读取名单文件并返回处理后的名单列表"""
+    if not os.path.exists(file_path):
+        # 默认名单，格式为：[名字, 概率等级]，默认概率为3(普通)
+        default_names = [
+            ["小明", 3],
+            ["李华", 3],
+            ["张四", 3],
+            ["小五", 3]
+        ]
+        save_names_to_file(file_path, default_names)
+        return default_names
+
+    try:
+        return load_roster(file_path).to_list()
+    except Exception as e:
+        print(f"读取文件时出错: {e}")
+        return []
+
+
+def normalize_names(names):
+    """把名单元素统一为 [名字, 概率等级]，非列表元素使用默认概率"""
+    return [list(name_data[:2]) if isinstance(name_data, list) and len(name_data) >= 2
+            else [name_data, DEFAULT_PROBABILITY] for name_data in names]
+
+
+def format_roster_text(names_data):
+    """生成名单文件内容(UTF-8 字节)"""
+    return "".join(f"{name},{tier}\n" for name, tier in names_data).encode("utf-8")
+
+
+def atomic_write(file_path, data):
+    """写入临时文件并 fsync 后替换目标文件，读取方不会看到写了一半的文件"""
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _patch_cache(cache_path, old_stat, stat, source_bytes, roster, dirty_rows):
+    """只改写缓存中变化的概率等级字节，缓存与旧文件或新名单不匹配时返回 False
+
+    行号按名字对齐：缓存中的名字及顺序必须与 roster 完全相同(例如文件被重新排序后
+    尚未重新加载时不能按行号改写)。先写入各行再更新文件头，
+    中途中断时文件头仍对应旧文件，缓存会被判定失效。
+    """
+    try:
+        with open(cache_path, "r+b") as f:
+            header = f.read(CACHE_HEADER.size)
+            if len(header) < CACHE_HEADER.size:
+                return False
+            magic, version, count, mtime_ns, size, _ = CACHE_HEADER.unpack(header)
+            if (magic, version, count) != (CACHE_MAGIC, CACHE_VERSION, len(roster)):
+                return False
+            if (mtime_ns, size) != (old_stat.st_mtime_ns, old_stat.st_size):
+                return False
+            f.seek(CACHE_HEADER.size + count)
+            if f.read() != "\n".join(roster.names).encode("utf-8"):
+                return False
+
+            for row in sorted(dirty_rows):
+                f.seek(CACHE_HEADER.size + row)
+                f.write(bytes((roster.tiers[row],)))
+            f.seek(0)
+            f.write(CACHE_HEADER.pack(
+                CACHE_MAGIC,
+                CACHE_VERSION,
+                count,
+                stat.st_mtime_ns,
+                stat.st_size,
+                hashlib.sha1(source_bytes).digest()
+            ))
+        return True
+    except OSError:
+        return False
+
+
+def save_roster(file_path, names_data, dirty_rows=None):
+    """一次性原子写入名单文件，并同步更新二进制缓存
+
+    dirty_rows 为仅概率等级发生变化的行号集合(名字与顺序不变)，
+    提供时只改写缓存中对应的字节。返回写入统计信息。
+    """
+    start = time.perf_counter()
+    names_data = normalize_names(names_data)
+    try:
+        old_stat = os.stat(file_path)
+    except OSError:
+        old_stat = None
+
+    data = format_roster_text(names_data)
+    atomic_write(file_path, data)
+    write_time = time.perf_counter() - start
+
+    stat = os.stat(file_path)
+    roster = Roster.from_list(names_data)
+    cache_path = cache_path_for(file_path)
+    patched = (dirty_rows is not None and old_stat is not None
+               and _patch_cache(cache_path, old_stat, stat, data, roster, dirty_rows))
+    if not patched:
+        _write_cache(cache_path, stat, data, roster)
+
+    return {
+        "rows": len(names_data),
+        "dirty_rows": len(dirty_rows) if dirty_rows is not None else None,
+        "bytes": len(data),
+        "write_ms": write_time * 1000,
+        "total_ms": (time.perf_counter() - start) * 1000,
+        "cache_patched": patched,
+    }
+
+
+def save_names_to_file(file_path, names, dirty_rows=None):
+    """保存名单到文件，返回写入统计信息，失败时返回 None"""
+    try:
+        return save_roster(file_path, names, dirty_rows)
+    except Exception as e:
+        print(f"保存文件时出错: {e}")
+        return None
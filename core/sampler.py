@@ -0,0 +1,485 @@
+"""点名抽取器：根据概率等级构建的加权抽样结构"""
+import heapq
+import math
+import random
+from array import array
+
+# 可选依赖 NumPy 的导入结果：None 表示未安装，False 表示尚未尝试导入
+_numpy = False
+
+# 概率等级对应的权重
+PROBABILITY_WEIGHTS = {
+    1: 0,     # 不可能 - 权重为0
+    2: 10,    # 小概率 - 权重为10
+    3: 30,    # 普通 - 权重为30
+    4: 60,    # 大概率 - 权重为60
+    5: 100    # 绝对 - 权重为100
+}
+DEFAULT_WEIGHT = 30
+
+
+def optional_numpy():
+    """按需导入 NumPy，未安装时返回 None
+
+    导入 NumPy 需要数十毫秒，只在第一次用到向量化实现时导入，不影响插件的导入耗时。
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # NumPy 为可选依赖
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def effective_weights(names_data, absent=()):
+    """按点名规则计算每位学生的有效权重
+
+    - 等级1权重为0
+    - 如果存在"绝对"级别的学生，其余学生权重为0
+    - 如果所有权重都为0(可能全是"不可能"级别)，每位学生权重为1
+    absent 中的学生(缺勤)不参与后两项判断，但同样按规则得到权重，出勤后使用。
+    """
+    present = [item for item in names_data if item[0] not in absent] if absent else names_data
+    has_absolute = any(item[1] == 5 for item in present)
+
+    weights = []
+    for name_data in names_data:
+        probability = name_data[1]
+        if has_absolute and probability < 5:
+            weights.append(0)
+        else:
+            weights.append(PROBABILITY_WEIGHTS.get(probability, DEFAULT_WEIGHT))
+
+    if absent:
+        present_weights = (weight for item, weight in zip(names_data, weights) if item[0] not in absent)
+    else:
+        present_weights = weights
+    if not any(present_weights):
+        weights = [1] * len(names_data)
+    return weights
+
+
+class AliasTable:
+    """Walker/Vose 别名表：O(n) 构建，O(1) 按权重抽取下标"""
+
+    def __init__(self, weights, rng=None):
+        self.rng = rng or random
+        n = len(weights)
+        self.size = n
+        self.prob = array('d', [0.0]) * n
+        self.alias = array('l', [0]) * n
+
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            return
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # 浮点误差导致的剩余项概率视为1
+        for i in large:
+            self.prob[i] = 1.0
+        for i in small:
+            self.prob[i] = 1.0
+
+    def draw(self):
+        """抽取一个下标"""
+        rng = self.rng
+        i = int(rng.random() * self.size)
+        if rng.random() < self.prob[i]:
+            return i
+        return self.alias[i]
+
+
+class WeightedPool:
+    """不放回的加权抽取池
+
+    与原先"每人按权重复制若干份后打乱"的抽取池完全等价：
+    一轮中每位学生恰好被抽到"权重"次，抽完后自动开始新一轮。
+    但不再展开整个列表，仅保存每人的剩余次数，配合别名表做拒绝采样；
+    当剩余总数降到别名表构建时的一半以下时重建别名表，
+    因此每次抽取的期望尝试次数不超过2次。
+
+    缺勤的学生被屏蔽(set_masked)：拒绝采样时直接拒绝，保留其剩余次数，
+    O(1) 切换，无需重建。别名表只包含构建时出勤的学生，之后回到出勤的
+    学生放在一个小的附加集合中单独按权重抽取，直到下次重建。
+    """
+
+    def __init__(self, names, weights, rng=None):
+        self.rng = rng or random
+        self.names = list(names)
+        self.weights = array('l', weights)
+        self.total = sum(self.weights)
+        self.masked = bytearray(len(self.names))
+        self.masked_total = 0
+        self.reset()
+
+    def __len__(self):
+        """出勤学生的权重之和"""
+        return self.total - self.masked_total
+
+    @property
+    def remaining(self):
+        """本轮剩余的抽取次数"""
+        return self.remaining_total
+
+    def reset(self):
+        """开始新一轮抽取"""
+        self.counts = array('l', self.weights)
+        self.remaining_total = self.total
+        self.masked_remaining = self.masked_total
+        self._rebuild()
+
+    def _rebuild(self):
+        masked = self.masked
+        self.table_weights = array('l', (0 if masked[i] else c for i, c in enumerate(self.counts)))
+        self.table_total = self.remaining_total - self.masked_remaining
+        self.table = AliasTable(self.table_weights, self.rng)
+        self.extra = {}  # 别名表构建后回到出勤的学生下标
+        self.extra_remaining = 0
+        self.stale = False
+
+    def weight(self, index):
+        return self.weights[index]
+
+    def set_weight(self, index, weight):
+        """修改某位学生的权重，保留本轮已抽取的进度"""
+        delta = weight - self.weights[index]
+        if not delta:
+            return
+        self.weights[index] = weight
+        self.total += delta
+
+        count = max(0, min(weight, self.counts[index] + delta))
+        self.remaining_total += count - self.counts[index]
+        if self.masked[index]:
+            self.masked_total += delta
+            self.masked_remaining += count - self.counts[index]
+        self.counts[index] = count
+        # 别名表在下次抽取前重建
+        self.stale = True
+
+    def set_masked(self, index, masked):
+        """屏蔽(缺勤)或恢复(出勤)某位学生，O(1)，保留本轮进度"""
+        if bool(self.masked[index]) == masked:
+            return
+        self.masked[index] = masked
+        sign = 1 if masked else -1
+        self.masked_total += sign * self.weights[index]
+        self.masked_remaining += sign * self.counts[index]
+        if masked:
+            if self.extra.pop(index, None) is not None:
+                self.extra_remaining -= self.counts[index]
+        elif self.stale or index >= len(self.table_weights):
+            # 别名表在下次抽取前重建，届时会包含该学生
+            pass
+        elif self.table_weights[index] < self.counts[index]:
+            # 构建别名表时该学生缺勤，不在表中
+            self.extra[index] = True
+            self.extra_remaining += self.counts[index]
+
+    def append(self, name, weight):
+        """加入一位学生(本轮按完整权重参与)，返回其下标"""
+        self.names.append(name)
+        self.weights.append(weight)
+        self.counts.append(weight)
+        self.masked.append(0)
+        self.total += weight
+        self.remaining_total += weight
+        self.stale = True
+        return len(self.names) - 1
+
+    def draw_index(self):
+        """抽取一个学生下标，名单为空时返回 None"""
+        if not len(self):
+            return None
+        present = self.remaining_total - self.masked_remaining
+        if not present:
+            # 出勤学生本轮已抽完
+            self.reset()
+            present = self.remaining_total - self.masked_remaining
+        elif self.stale or (present - self.extra_remaining) * 2 < self.table_total:
+            self._rebuild()
+
+        rng = self.rng
+        counts = self.counts
+        if self.extra_remaining and rng.random() * present < self.extra_remaining:
+            i = self._draw_extra()
+            self.extra_remaining -= 1
+        else:
+            masked = self.masked
+            table_weights = self.table_weights
+            while True:
+                i = self.table.draw()
+                if not masked[i] and rng.random() * table_weights[i] < counts[i]:
+                    break
+
+        counts[i] -= 1
+        self.remaining_total -= 1
+        return i
+
+    def _draw_extra(self):
+        """在附加集合中按剩余次数抽取"""
+        value = self.rng.random() * self.extra_remaining
+        for i in self.extra:
+            value -= self.counts[i]
+            if value < 0 and self.counts[i]:
+                return i
+        return next(i for i in self.extra if self.counts[i])
+
+    def draw(self):
+        """抽取一个名字，名单为空时返回 None"""
+        index = self.draw_index()
+        if index is None:
+            return None
+        return self.names[index]
+
+
+class FenwickTree:
+    """树状数组：O(log n) 修改单个权重，O(log n) 按权重抽取下标"""
+
+    def __init__(self, weights):
+        self.build(weights)
+
+    def build(self, weights):
+        """以 O(n) 重新构建整棵树"""
+        self.size = len(weights)
+        self.weights = array('d', weights)
+        self.tree = array('d', [0.0]) * (self.size + 1)
+        tree = self.tree
+        for i, w in enumerate(self.weights, 1):
+            tree[i] += w
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self.top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    @property
+    def total(self):
+        """所有权重之和"""
+        return self.prefix(self.size)
+
+    def prefix(self, count):
+        """前 count 个权重之和"""
+        total = 0.0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def append(self, weight):
+        """在末尾追加一个权重，O(log n)"""
+        i = self.size + 1
+        # 新节点覆盖区间 (i - lowbit(i), i]
+        covered = self.prefix(i - 1) - self.prefix(i - (i & -i))
+        self.weights.append(weight)
+        self.tree.append(weight + covered)
+        self.size = i
+        self.top_bit = 1 << (i.bit_length() - 1)
+
+    def update(self, index, weight):
+        """将第 index 个权重设为 weight"""
+        delta = weight - self.weights[index]
+        if not delta:
+            return
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, value):
+        """返回前缀和首次超过 value 的下标"""
+        pos = 0
+        step = self.top_bit
+        tree = self.tree
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and tree[nxt] <= value:
+                pos = nxt
+                value -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def sample(self, rng=random):
+        """按权重抽取一个下标，总权重为0时返回 None"""
+        total = self.total
+        if total <= 0:
+            return None
+        index = self.find(rng.random() * total)
+        if index >= self.size or self.weights[index] <= 0:
+            # 多次增量修改累积了浮点误差，重建后再抽
+            self.build(self.weights)
+            total = self.total
+            if total <= 0:
+                return None
+            index = min(self.find(rng.random() * total), self.size - 1)
+        return index
+
+
+class FairSampler:
+    """公平模式抽取器
+
+    学生被点到后权重降为原来的 decay 倍，之后每次抽取线性恢复，
+    recovery 次抽取后回到原始权重。只有恢复期内的学生需要更新，
+    因此每次抽取的开销为 O(recovery * log n)，无需重建整个抽取池。
+    """
+
+    def __init__(self, names, weights, rng=None, decay=0.2, recovery=10):
+        self.rng = rng or random
+        self.names = list(names)
+        self.base_weights = array('d', weights)
+        self.decay = decay
+        self.recovery = max(1, recovery)
+        self.draws = 0
+        self.recovering = {}  # 学生下标 -> 被点到时的抽取序号
+        self.masked = bytearray(len(self.names))  # 缺勤的学生
+        self.active = sum(1 for w in self.base_weights if w > 0)
+        self.tree = FenwickTree(self.base_weights)
+
+    def __len__(self):
+        """权重大于0的出勤学生人数"""
+        return self.active
+
+    def reset(self):
+        """清除所有衰减，恢复原始权重(缺勤的学生仍被屏蔽)"""
+        self.draws = 0
+        self.recovering.clear()
+        masked = self.masked
+        self.tree.build([0.0 if masked[i] else w for i, w in enumerate(self.base_weights)])
+
+    def weight(self, index):
+        return self.base_weights[index]
+
+    def append(self, name, weight):
+        """加入一位学生，返回其下标"""
+        self.names.append(name)
+        self.base_weights.append(weight)
+        self.masked.append(0)
+        self.active += weight > 0
+        self.tree.append(weight)
+        return len(self.names) - 1
+
+    def set_weight(self, index, weight):
+        """修改某位学生的原始权重"""
+        if not self.masked[index]:
+            self.active += (weight > 0) - (self.base_weights[index] > 0)
+        self.base_weights[index] = weight
+        self.tree.update(index, self._current_weight(index))
+
+    def set_masked(self, index, masked):
+        """屏蔽(缺勤)或恢复(出勤)某位学生，O(log n)"""
+        if bool(self.masked[index]) == masked:
+            return
+        self.masked[index] = masked
+        if self.base_weights[index] > 0:
+            self.active += -1 if masked else 1
+        self.tree.update(index, self._current_weight(index))
+
+    def _current_weight(self, index):
+        """树中应有的权重：缺勤为0，否则为原始权重乘以衰减系数"""
+        if self.masked[index]:
+            return 0.0
+        return self.base_weights[index] * self._factor(index)
+
+    def _factor(self, index):
+        picked_at = self.recovering.get(index)
+        if picked_at is None:
+            return 1.0
+        age = self.draws - picked_at
+        return self.decay + (1.0 - self.decay) * min(age, self.recovery) / self.recovery
+
+    def _recover(self):
+        """推进恢复期内学生的权重"""
+        finished = []
+        for index, picked_at in self.recovering.items():
+            factor = self._factor(index)
+            self.tree.update(index, self._current_weight(index))
+            if factor >= 1.0:
+                finished.append(index)
+        for index in finished:
+            del self.recovering[index]
+
+    def draw_index(self):
+        """抽取一个学生下标，名单为空时返回 None"""
+        index = self.tree.sample(self.rng)
+        if index is None:
+            return None
+
+        self.draws += 1
+        self._recover()
+
+        # 重新插入，使字典保持按被点时间排序
+        self.recovering.pop(index, None)
+        self.recovering[index] = self.draws
+        self.tree.update(index, self.base_weights[index] * self.decay)
+        return index
+
+    def draw(self):
+        """抽取一个名字，名单为空时返回 None"""
+        index = self.draw_index()
+        if index is None:
+            return None
+        return self.names[index]
+
+
+# 可选的抽取模式
+SAMPLER_MODES = {
+    "pool": WeightedPool,   # 洗牌池：每轮按权重不放回抽取
+    "fair": FairSampler,    # 公平模式：近期被点到的学生概率降低
+}
+DEFAULT_MODE = "pool"
+
+
+def create_sampler(mode, names, weights, rng=None):
+    """按模式名创建抽取器，未知模式使用默认模式"""
+    sampler_class = SAMPLER_MODES.get(mode, SAMPLER_MODES[DEFAULT_MODE])
+    return sampler_class(names, weights, rng=rng)
+
+
+def draw_distinct(names_data, k, rng=None):
+    """一次抽取 k 位互不重复的学生，规则与单次点名相同(见 effective_weights)
+
+    - 如果存在"绝对"级别的学生，只从他们中抽取，人数不足 k 时只返回这些学生
+    - 否则按权重不放回抽取(Efraimidis-Spirakis 键值法)，"不可能"级别的学生不会入选
+    - 若所有人都是"不可能"级别，则从全体中等概率抽取
+    有 NumPy 且未指定 rng 时使用向量化实现。
+    """
+    if k <= 0 or not names_data:
+        return []
+    picked = _top_keys(effective_weights(names_data), k, rng)
+    return [names_data[i][0] for i in picked]
+
+
+def _top_keys(weights, k, rng=None):
+    """按权重不放回抽取 k 个下标：键值 log(u)/w 最大的 k 项"""
+    numpy = optional_numpy() if rng is None else None
+    if numpy is not None:
+        w = numpy.asarray(weights, dtype=float)
+        candidates = numpy.flatnonzero(w > 0)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        keys = numpy.log(numpy.random.random(len(candidates))) / w[candidates]
+        top = numpy.argpartition(-keys, k - 1)[:k]
+        top = top[numpy.argsort(-keys[top])]
+        return candidates[top].tolist()
+
+    rng = rng or random
+    keys = ((math.log(1.0 - rng.random()) / w, i) for i, w in enumerate(weights) if w > 0)
+    return [i for _, i in heapq.nlargest(k, keys)]
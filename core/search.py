@@ -0,0 +1,47 @@
+"""名字前缀搜索索引，安装 pypinyin 时同时支持全拼与拼音首字母"""
+from bisect import bisect_left
+
+# pypinyin 的导入结果：None 表示未安装，False 表示尚未尝试导入
+_pypinyin = False
+
+
+def _load_pypinyin():
+    """第一次建立索引时才导入 pypinyin(会加载拼音词典)，不影响插件的导入耗时"""
+    global _pypinyin
+    if _pypinyin is False:
+        try:
+            import pypinyin
+        except ImportError:  # 未安装时只按名字本身搜索
+            pypinyin = None
+        _pypinyin = pypinyin
+    return _pypinyin
+
+
+def search_keys(name, pypinyin=None):
+    """名字的所有搜索键：名字本身，以及全拼(zhangsan)和首字母(zs)"""
+    keys = {name.casefold()}
+    if pypinyin is not None:
+        keys.add("".join(pypinyin.lazy_pinyin(name)).casefold())
+        keys.add("".join(pypinyin.lazy_pinyin(name, style=pypinyin.Style.FIRST_LETTER)).casefold())
+    return keys
+
+
+class NameSearchIndex:
+    """按 (搜索键, 下标) 排序的列表，前缀查询为 O(log n + 命中数)"""
+
+    def __init__(self, names):
+        pypinyin = _load_pypinyin()
+        self.entries = sorted(
+            (key, index) for index, name in enumerate(names) for key in search_keys(name, pypinyin)
+        )
+
+    def search(self, prefix):
+        """返回任一搜索键以 prefix 开头(不区分大小写)的下标集合"""
+        prefix = prefix.strip().casefold()
+        entries = self.entries
+        indexes = set()
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and entries[position][0].startswith(prefix):
+            indexes.add(entries[position][1])
+            position += 1
+        return indexes
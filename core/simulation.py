@@ -0,0 +1,117 @@
+"""洗牌池点名的频率估算与蒙特卡洛模拟：每位学生的点名频率与全班都被点到所需的次数
+
+洗牌池每轮按有效权重不放回抽取：学生 i 在一轮中恰好出现 w_i 次，顺序随机。
+因此频率可以直接算出：前 r 次点名中学生 i 平均被点到 r * w_i / 一轮次数。
+
+全班都被点到所需的次数需要模拟。一轮的随机顺序等价于给每一"张"签分配一个
+独立的均匀随机键并按键排序，学生第一次被点到的位置由其最小键决定，
+全班都被点到所需的次数等于键不大于"各学生最小键中的最大值" M 的签数。
+模拟时不需要为每张签生成键：
+
+- 学生 i 的最小键 m_i 是 w_i 个均匀随机数的最小值，可由一个随机数直接生成；
+- 已知 m_i 时其余 w_i - 1 张签的键在 (m_i, 1) 上独立均匀分布，
+  其中不大于 M 的张数服从二项分布 B(w_i - 1, (M - m_i) / (1 - m_i))。
+
+每轮模拟的开销与学生人数成正比，与一轮的点名次数无关。
+有 NumPy 时一次对大量轮次向量化计算，否则逐轮模拟(轮次较少)。
+"""
+import random
+import time
+
+from .sampler import effective_weights, optional_numpy
+
+# 每次模拟生成的学生最小键数(轮数 × 可被点到的人数)上限，决定模拟的轮数
+SIMULATION_KEYS = 500000
+
+# 纯 Python 实现的上限，2万人时约为2轮
+PYTHON_SIMULATION_KEYS = 50000
+
+# 模拟轮数的上限
+MAX_TRIALS = 2000
+
+# 默认按每多少次点名统计频率
+DEFAULT_DRAWS = 100
+
+
+def simulate_pool(names_data, draws=DEFAULT_DRAWS, trials=None, rng=None):
+    """估算从新一轮开始的洗牌池点名，返回统计结果，名单中没有可被点到的学生时返回 None
+
+    结果字段：
+    - frequencies: 每位学生在 draws 次点名中平均被点到的次数(与 names_data 顺序一致，精确值)
+    - coverage_mean / coverage_p90: 全班可被点到的学生都至少被点到一次所需的点名次数(平均值/90%分位)
+    - eligible: 可被点到的学生人数(有"绝对"级别的学生时只有他们)
+    - round_size: 一轮的点名次数(有效权重之和)
+    - trials / elapsed_ms / vectorized: 模拟轮数、耗时与是否使用了 NumPy
+    有 NumPy 且未指定 rng 时使用向量化实现。
+    """
+    start = time.perf_counter()
+    weights = effective_weights(names_data)
+    round_size = sum(weights)
+    if not round_size:
+        return None
+    eligible = [w for w in weights if w]
+
+    numpy = optional_numpy() if rng is None else None
+    vectorized = numpy is not None
+    budget = SIMULATION_KEYS if vectorized else PYTHON_SIMULATION_KEYS
+    if trials is None:
+        trials = max(1, min(MAX_TRIALS, budget // len(eligible)))
+
+    if vectorized:
+        coverage = _simulate_numpy(numpy, eligible, trials)
+    else:
+        coverage = _simulate_python(eligible, trials, rng or random)
+
+    coverage.sort()
+    return {
+        "frequencies": [draws * w / round_size for w in weights],
+        "coverage_mean": sum(coverage) / trials,
+        "coverage_p90": coverage[min(trials - 1, int(trials * 0.9))],
+        "eligible": len(eligible),
+        "round_size": round_size,
+        "trials": trials,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+        "vectorized": vectorized,
+    }
+
+
+def _simulate_numpy(numpy, weights, trials):
+    """一次模拟 trials 轮，返回每轮的覆盖次数(weights 只含大于0的权重)"""
+    generator = numpy.random.default_rng()
+    w = numpy.asarray(weights, dtype=numpy.int64)
+    # 1 - random() 在 (0, 1] 上，最小键 m 在 [0, 1) 上
+    first = 1.0 - (1.0 - generator.random((trials, len(w)))) ** (1.0 / w)
+    last_first = first.max(axis=1)
+    later = generator.binomial(w - 1, (last_first[:, None] - first) / (1.0 - first))
+    return (later.sum(axis=1) + len(w)).tolist()
+
+
+def _simulate_python(weights, trials, rng):
+    """逐轮模拟，返回值同 _simulate_numpy"""
+    coverage = []
+    for _ in range(trials):
+        first = [1.0 - (1.0 - rng.random()) ** (1.0 / w) for w in weights]
+        last_first = max(first)
+        later = 0
+        for w, m in zip(weights, first):
+            if w > 1 and m < last_first:
+                later += _binomial(w - 1, (last_first - m) / (1.0 - m), rng)
+        coverage.append(later + len(weights))
+    return coverage
+
+
+def _binomial(n, p, rng):
+    """按累积概率逐项查找的二项分布抽样(n 不超过单个学生的权重，期望步数约为 n * p)"""
+    q = 1.0 - p
+    if q <= 0.0:
+        return n
+    ratio = p / q
+    probability = q ** n
+    total = probability
+    value = rng.random()
+    k = 0
+    while total < value and k < n:
+        probability *= (n - k) / (k + 1) * ratio
+        k += 1
+        total += probability
+    return k
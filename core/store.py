@@ -0,0 +1,377 @@
+"""进程内共享的名单仓库：名单、抽取器与版本号集中管理"""
+import os
+import time
+from collections import OrderedDict
+
+from .roster import Roster, diff_rosters, normalize_names, read_names_from_file, save_names_to_file
+from .sampler import DEFAULT_MODE, create_sampler, draw_distinct, effective_weights
+
+# 缓存的名单仓库的内存上限(估计值)，超出时释放最久未使用的仓库
+STORE_CACHE_BYTES = 64 * 1024 * 1024
+
+# 每人在 names_data、Roster 与抽取器中约占的内存(字节，按2万人的名单实测)
+STORE_BYTES_PER_ROW = 400
+
+# 考勤记录的有效时长(秒)：宿主没有提供课程信息时，距最后一次修改超过该时长视为下课
+ATTENDANCE_SESSION_SECONDS = 60 * 60
+
+# 名单文件路径 -> RosterStore，同一进程内的所有组件共享，按最近使用排序
+_stores = OrderedDict()
+
+
+def get_store(file_path, load=True, source=None):
+    """获取名单文件对应的共享仓库
+
+    load 为 True 时确保名单已读取；为 False 时可能返回尚未加载的仓库，
+    由调用方在后台线程中调用 build_snapshot() 并在界面线程中 install()。
+    仓库连同抽取进度一起缓存，再次获取时无需重新读取和构建。
+    source 为名单的读写方式，默认为 file_path 指向的文本文件。
+    """
+    key = os.path.normcase(os.path.abspath(file_path))
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = RosterStore(file_path, load=load, source=source)
+    else:
+        _stores.move_to_end(key)
+        if load:
+            store.ensure_loaded()
+    evict_stores()
+    return store
+
+
+def evict_stores(limit=STORE_CACHE_BYTES):
+    """估计内存超出上限时，从最久未使用的开始释放没有订阅者的仓库
+
+    最近使用的仓库总是保留；有订阅者说明仍有界面在使用，同样保留。
+    """
+    total = sum(store.estimated_bytes() for store in _stores.values())
+    for key in list(_stores)[:-1]:
+        if total <= limit:
+            break
+        store = _stores[key]
+        if store._subscribers:
+            continue
+        total -= store.estimated_bytes()
+        del _stores[key]
+
+
+def set_all_draw_modes(mode):
+    """把抽取模式应用到所有已缓存的仓库，切换班级时不会回到旧的模式"""
+    for store in list(_stores.values()):
+        store.set_draw_mode(mode)
+
+
+def end_all_attendance():
+    """下课：清除所有已缓存班级的缺勤标记"""
+    for store in list(_stores.values()):
+        store.end_attendance()
+
+
+class TextRosterSource:
+    """names.txt 格式的名单文件"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def read(self):
+        return read_names_from_file(self.file_path)
+
+    def save(self, names_data, dirty_rows=None):
+        return save_names_to_file(self.file_path, names_data, dirty_rows)
+
+    def record_draws(self, names):
+        """文本名单不保存点名记录(历史记录见 history.py)"""
+
+
+class RosterStore:
+    """持有解析后的名单和抽取器
+
+    名单变化时版本号加一并通知所有订阅者，
+    各组件从这里读取名单，点名过程中不再读写文件。
+    本节课缺勤的学生记录在 absent 中，在抽取器中被屏蔽，下课后自动清除。
+    """
+
+    def __init__(self, file_path, draw_mode=DEFAULT_MODE, load=True, source=None):
+        self.file_path = file_path
+        self.source = source or TextRosterSource(file_path)
+        self.draw_mode = draw_mode
+        self.loaded = False
+        self.version = 0
+        self.roster = Roster()
+        self.names_data = []
+        self.sampler = None
+        self.slots = {}  # 名字 -> 抽取器中的下标
+        self.last_diff = None
+        self.last_save_stats = None
+        self.absent = set()
+        self.attendance_time = 0.0  # 最后一次修改考勤的时间
+        self._subscribers = []
+        if load:
+            self.ensure_loaded()
+
+    @property
+    def names(self):
+        """名字列表(不含概率信息)"""
+        return self.roster.names
+
+    def estimated_bytes(self):
+        """名单与抽取器占用内存的估计值"""
+        return max(len(self.slots), len(self.names_data)) * STORE_BYTES_PER_ROW
+
+    def subscribe(self, callback):
+        """注册名单变化回调，回调参数为仓库本身"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self):
+        for callback in list(self._subscribers):
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"名单更新通知出错: {e}")
+
+    def _set_names(self, names_data):
+        self.names_data = names_data
+        self.roster = Roster.from_list(names_data)
+        self.version += 1
+        self.last_diff = None
+        self.reset_sampler()
+        self._notify()
+
+    def ensure_loaded(self):
+        """尚未加载时同步读取名单"""
+        if not self.loaded:
+            self.install(self.build_snapshot())
+
+    def build_snapshot(self):
+        """读取名单并构建抽取器，不修改仓库本身，可以在后台线程中调用"""
+        start = time.perf_counter()
+        draw_mode = self.draw_mode
+        names_data = self.source.read()
+        read_done = time.perf_counter()
+        roster = Roster.from_list(names_data)
+        sampler = create_sampler(draw_mode, roster.names, effective_weights(names_data))
+        return {
+            "names_data": names_data,
+            "roster": roster,
+            "sampler": sampler,
+            "draw_mode": draw_mode,
+            "read_ms": (read_done - start) * 1000,
+            "build_ms": (time.perf_counter() - read_done) * 1000,
+        }
+
+    def install(self, snapshot):
+        """一次性替换为 build_snapshot() 的结果(在界面线程调用)
+
+        仓库在此期间已经加载过时丢弃该结果并返回 False。
+        """
+        if self.loaded:
+            return False
+        self.names_data = snapshot["names_data"]
+        self.roster = snapshot["roster"]
+        self.slots = {name: index for index, name in enumerate(self.roster.names)}
+        self.sampler = snapshot["sampler"]
+        self.loaded = True
+        if snapshot["draw_mode"] != self.draw_mode:
+            self.reset_sampler()
+        else:
+            self._apply_absent()
+            if self.absent:
+                self._refresh_weights()
+        self.version += 1
+        self.last_diff = None
+        self._notify()
+        return True
+
+    def reload(self):
+        """从文件重新读取名单，只把变化的部分应用到抽取器"""
+        return self.apply_names(self.source.read())
+
+    def save(self, names_data, dirty_rows=None):
+        """保存名单到文件并通知所有组件
+
+        名字与顺序不变时自动找出概率等级变化的行，缓存只改写这些行。
+        """
+        names_data = normalize_names(names_data)
+        if dirty_rows is None and len(names_data) == len(self.names_data):
+            dirty_rows = set()
+            for row, (old, new) in enumerate(zip(self.names_data, names_data)):
+                if old[0] != new[0]:
+                    dirty_rows = None
+                    break
+                if old[1] != new[1]:
+                    dirty_rows.add(row)
+
+        stats = self.source.save(names_data, dirty_rows)
+        if stats:
+            self.last_save_stats = stats
+            print(f"名单已保存: {stats['rows']}行, 写入耗时 {stats['write_ms']:.1f} ms")
+        self.apply_names(names_data)
+
+    def set_tiers(self, changes):
+        """批量修改概率等级并保存，changes 为 {行号: 新等级}"""
+        if not changes:
+            return
+        names_data = [list(item) for item in self.names_data]
+        for row, tier in changes.items():
+            names_data[row][1] = max(1, min(5, int(tier)))
+        self.save(names_data, dirty_rows=set(changes))
+
+    def apply_names(self, names_data):
+        """增量应用新名单，保留本轮"不重复"抽取的进度
+
+        新增的学生追加到抽取器末尾，删除的学生权重置0(保留下标)，
+        其余学生仅在有效权重变化时更新。无法按名字对齐或
+        已删除的下标过多时退回完整重建。只调整了顺序时抽取器不变，
+        但名单按新顺序替换(行号与文件保持一致)。返回 (新增, 删除, 等级变化)。
+        """
+        self.loaded = True
+        diff = diff_rosters(self.names_data, names_data)
+        if diff is None or self.sampler is None:
+            self._set_names(names_data)
+            return None
+
+        added, removed, retiered = diff
+        if not (added or removed or retiered):
+            if [item[0] for item in names_data] != self.roster.names:
+                self._replace_names(names_data, diff)
+            return diff
+
+        weights = effective_weights(names_data, self.absent)
+        if len(self.slots) + len(added) > 2 * max(1, len(names_data)):
+            self._set_names(names_data)
+            return diff
+
+        for name in removed:
+            self.sampler.set_weight(self.slots[name], 0)
+            if name in self.absent:
+                self.absent.discard(name)
+                self.sampler.set_masked(self.slots[name], False)
+        for name_data, weight in zip(names_data, weights):
+            index = self.slots.get(name_data[0])
+            if index is None:
+                self.slots[name_data[0]] = self.sampler.append(name_data[0], weight)
+            elif self.sampler.weight(index) != weight:
+                self.sampler.set_weight(index, weight)
+
+        self._replace_names(names_data, diff)
+        return diff
+
+    def _replace_names(self, names_data, diff):
+        """替换名单但不重建抽取器(抽取器按名字定位学生，与名单顺序无关)"""
+        self.names_data = names_data
+        self.roster = Roster.from_list(names_data)
+        self.version += 1
+        self.last_diff = diff
+        self._notify()
+
+    def reset_sampler(self):
+        """根据当前名单和抽取模式重建抽取器"""
+        self.slots = {item[0]: index for index, item in enumerate(self.names_data)}
+        self.absent.intersection_update(self.slots)
+        weights = effective_weights(self.names_data, self.absent)
+        self.sampler = create_sampler(self.draw_mode, self.names, weights)
+        self._apply_absent()
+
+    def _apply_absent(self):
+        for name in self.absent:
+            index = self.slots.get(name)
+            if index is not None:
+                self.sampler.set_masked(index, True)
+
+    def _refresh_weights(self):
+        """按当前出勤重新计算有效权重，只更新变化的学生"""
+        weights = effective_weights(self.names_data, self.absent)
+        for item, weight in zip(self.names_data, weights):
+            index = self.slots[item[0]]
+            if self.sampler.weight(index) != weight:
+                self.sampler.set_weight(index, weight)
+
+    def _affects_weights(self, name, absent):
+        """切换该学生的出勤是否可能改变"绝对"级别或全为0的判断
+
+        只有"绝对"级别的学生、最后一位权重大于0的出勤学生缺勤，
+        以及全为0(每人权重为1)时等级大于1的学生回来，才会改变判断。
+        """
+        try:
+            tier = self.roster.tiers[self.roster.names.index(name)]
+        except ValueError:
+            return False  # 已从名单中删除，权重为0
+        if tier == 5:
+            return True
+        if absent:
+            return not len(self.sampler)
+        return tier > 1 and self.sampler.weight(self.slots[name]) == 1
+
+    def set_absent(self, name, absent=True):
+        """标记学生本节课缺勤或出勤，只屏蔽抽取器中的一项，不重建
+
+        缺勤的学生不参与"绝对"级别与全为0的判断，判断因此改变时
+        重新计算有效权重。名单本身没有变化，版本号不变；
+        订阅者据此区分考勤变化与名单变化。
+        """
+        self._check_attendance()
+        self.attendance_time = time.monotonic()
+        index = self.slots.get(name)
+        if index is None or (name in self.absent) == absent:
+            return
+        if absent:
+            self.absent.add(name)
+        else:
+            self.absent.discard(name)
+        if self.sampler is not None:
+            self.sampler.set_masked(index, absent)
+            if self._affects_weights(name, absent):
+                self._refresh_weights()
+        self._notify()
+
+    def end_attendance(self):
+        """下课：清除全部缺勤标记"""
+        if not self.absent:
+            return
+        for name in self.absent:
+            index = self.slots.get(name)
+            if index is not None and self.sampler is not None:
+                self.sampler.set_masked(index, False)
+        self.absent.clear()
+        if self.sampler is not None:
+            self._refresh_weights()
+        self._notify()
+
+    def _check_attendance(self):
+        """距最后一次修改考勤已超过 ATTENDANCE_SESSION_SECONDS 时结束考勤"""
+        if self.absent and time.monotonic() - self.attendance_time > ATTENDANCE_SESSION_SECONDS:
+            self.end_attendance()
+
+    def present_names_data(self):
+        """出勤学生的名单"""
+        self._check_attendance()
+        if not self.absent:
+            return self.names_data
+        return [item for item in self.names_data if item[0] not in self.absent]
+
+    def set_draw_mode(self, mode):
+        """切换抽取模式"""
+        if mode == self.draw_mode:
+            return
+        self.draw_mode = mode
+        self.reset_sampler()
+
+    def draw(self):
+        """抽取一个名字，名单为空时返回 None"""
+        self._check_attendance()
+        if not self.sampler:
+            return None
+        return self.sampler.draw()
+
+    def drawable_count(self):
+        """批量点名最多能抽到的人数：有效权重大于0的出勤学生(有"绝对"级别的学生时只有他们)"""
+        return sum(1 for weight in effective_weights(self.present_names_data()) if weight)
+
+    def draw_distinct(self, count):
+        """一次抽取多位互不重复的出勤学生"""
+        return draw_distinct(self.present_names_data(), count)
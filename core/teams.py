@@ -0,0 +1,30 @@
+"""分组：把名单分成人数与概率等级都均衡的若干组"""
+import heapq
+import random
+
+
+def split_into_teams(names_data, team_count, rng=None):
+    """将名单分为 team_count 组并返回每组的 [名字, 概率等级] 列表
+
+    先打乱再按概率等级从高到低排序(同等级内随机)，
+    依次放入"人数最少、等级总和最低"的组。
+    各组人数相差不超过1，等级总和尽量接近，复杂度 O(n log k)。
+    """
+    rng = rng or random
+    team_count = max(1, min(team_count, len(names_data)))
+    if not names_data:
+        return []
+
+    students = list(names_data)
+    rng.shuffle(students)
+    students.sort(key=lambda item: item[1], reverse=True)
+
+    teams = [[] for _ in range(team_count)]
+    # 堆元素：(人数, 等级总和, 组号)
+    heap = [(0, 0, i) for i in range(team_count)]
+    for student in students:
+        size, tier_sum, index = heapq.heappop(heap)
+        teams[index].append(student)
+        heapq.heappush(heap, (size + 1, tier_sum + student[1], index))
+
+    return teams
@@ -1,100 +1,506 @@
+import hashlib
+import io
 import os
-import random
-import subprocess
-import platform
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
 
-from qfluentwidgets import PrimaryPushButton, PushButton, DisplayLabel
-from qframelesswindow import FramelessDialog, FramelessWindow
-
-from .ClassWidgets.base import PluginBase, SettingsBase
-from PyQt5 import uic
-from PyQt5.QtCore import Qt, QPoint, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QMouseEvent
+# qfluentwidgets、uic 等界面依赖较重，在首次打开对话框或设置页时才导入
+from .ClassWidgets.base import PluginBase, SettingsBase, get_config
+from .core.animation import build_frames
+from .core.classes import DEFAULT_CLASS, ROSTER_DIR, list_classes
+from .core.history import KIND_NAME, get_history
+from .core.importer import ImportCancelled, RosterImporter
+from .core.roster import atomic_write, cache_path_for
+from .core.sampler import DEFAULT_MODE
+from .core.search import NameSearchIndex
+from .core.simulation import DEFAULT_DRAWS, simulate_pool
+from .core.store import TextRosterSource, end_all_attendance, get_store, set_all_draw_modes
+from .core.teams import split_into_teams
+from PyQt5.QtCore import (
+    Qt,
+    QPoint,
+    pyqtSignal,
+    QTimer,
+    QObject,
+    QFileSystemWatcher,
+    QAbstractTableModel,
+    QModelIndex,
+    QSortFilterProxyModel,
+    QRunnable,
+    QThreadPool,
+    PYQT_VERSION_STR
+)
+from PyQt5.QtGui import QFont, QMouseEvent, QImage, QPainter, QPixmap, QColor, QFontMetrics
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
     QLabel,
+    QListWidget,
+    QListWidgetItem,
     QDialog,
     QVBoxLayout,
     QDesktopWidget,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QHeaderView,
-    QHBoxLayout
+    QHBoxLayout,
+    QInputDialog,
+    QAction,
+    QFileDialog,
+    QMessageBox,
+    QProgressDialog
 )
 
 
-def read_names_from_file(file_path):
-    """读取名单文件并返回处理后的名单列表"""
-    if not os.path.exists(file_path):
-        # 默认名单，格式为：[名字, 概率等级]，默认概率为3(普通)
-        default_names = [
-            ["小明", 3],
-            ["李华", 3],
-            ["张四", 3],
-            ["小五", 3]
-        ]
-        save_names_to_file(file_path, default_names)
-        return default_names
+# 抽取模式及其在设置界面中的显示名称
+DRAW_MODE_LABELS = [
+    ("pool", "洗牌池（每轮按概率不重复）"),
+    ("fair", "公平模式（近期被点到的学生概率降低）"),
+]
 
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
-        
-        names = []
-        for line in lines:
-            if not line.strip():
-                continue
-                
-            parts = line.split(',')
-            name = parts[0].strip()
-            if not name:
+# 长按悬浮按钮超过该时长(毫秒)时进入批量点名
+LONG_PRESS_MS = 600
+
+# 名单文件变化后等待该时长(毫秒)再重新加载，合并编辑器的连续写入
+RELOAD_DEBOUNCE_MS = 300
+
+# 结果小组件
+RESULT_WIDGET_CODE = "random_name_result"
+RESULT_WIDGET_WIDTH = 250
+CLOCK_TITLE = "当前时间"
+
+# 时钟在每秒开始后稍晚几毫秒刷新，避免因计时器提前触发而显示上一秒
+CLOCK_ALIGN_MS = 5
+
+# 点名结果显示时长(毫秒)，之后恢复时间显示
+RESULT_DISPLAY_MS = 10000
+
+# 旧的轮询方式每秒需要的宿主调用次数：get_widget、title()、content()
+PROBE_CALLS_PER_TICK = 3
+
+# cw_contexts 未变化时，最多每隔该时长(秒)向宿主确认一次小组件是否存在
+WIDGET_CHECK_INTERVAL = 5.0
+
+# 动画调度器的计时器间隔(毫秒)，所有动画共用一个计时器
+ANIMATION_TICK_MS = 16
+
+# 小组件与结果对话框的过渡帧数
+WIDGET_ANIMATION_FRAMES = 8
+DIALOG_ANIMATION_FRAMES = 12
+
+# 结果对话框名字图像缓存的容量上限(字节)
+NAME_PIXMAP_CACHE_BYTES = 64 * 1024 * 1024
+
+# 宿主调用队列的最短发送间隔(毫秒)，约为一帧的刷新时间
+HOST_FLUSH_INTERVAL_MS = 16
+
+# 小组件内容发送失败后等待该时长(毫秒)再重新写入
+HOST_RETRY_MS = 1000
+
+# 通知发送失败时的最多重试次数
+HOST_NOTIFICATION_RETRIES = 2
+
+# 历史记录对话框每页显示的条数
+HISTORY_PAGE_SIZE = 50
+
+# 概率设置中修改等级后等待该时长(毫秒)再重新模拟，合并连续的修改
+SIMULATION_DELAY_MS = 30
+
+# 插件路径 -> 插件实例，供设置界面查找
+_plugin_instances = {}
+
+# 编译后的界面缓存文件首行标记，PyQt 版本变化时重新编译
+FORM_CACHE_TAG = f"uic {PYQT_VERSION_STR}"
+
+# .ui 文件路径 -> ((mtime_ns, 大小), 界面类)
+_form_classes = {}
+
+# 名单存储方式(config.json 中的 "storage")：文本名单文件，或全校部署时使用的 SQLite 数据库
+STORAGE_TEXT = "text"
+STORAGE_SQLITE = "sqlite"
+DATABASE_FILE = "classroll.db"
+
+# 数据库文件路径 -> RosterDatabase，首次打开可能在后台加载线程中进行
+_databases = {}
+_databases_lock = threading.Lock()
+
+# config.json 的默认内容，悬浮窗与设置页共享同一份配置(get_config)
+CONFIG_FILE = "config.json"
+DEFAULT_CONFIG = {"draw_mode": DEFAULT_MODE, "current_class": DEFAULT_CLASS, "storage": STORAGE_TEXT}
+
+
+def names_file_path(plugin_path=None):
+    """名单文件路径"""
+    return os.path.join(plugin_path or os.path.dirname(__file__), "names.txt")
+
+
+def class_files(plugin_path=None):
+    """班级名 -> 名单文件路径：names.txt 为默认班级，rosters 目录中每个 .txt 文件为一个班级"""
+    plugin_path = plugin_path or os.path.dirname(__file__)
+    return list_classes(names_file_path(plugin_path), os.path.join(plugin_path, ROSTER_DIR))
+
+
+def database_file_path(plugin_path=None):
+    return os.path.join(plugin_path or os.path.dirname(__file__), DATABASE_FILE)
+
+
+def database_opened(plugin_path=None):
+    """SQLite 名单库是否已经打开(此后列出班级不会阻塞)"""
+    return database_file_path(plugin_path) in _databases
+
+
+def open_database(plugin_path=None):
+    """打开 SQLite 名单库，数据库为空时先导入现有的文本名单
+
+    首次打开需要建表和导入，可能较慢，启动时由后台加载线程调用。
+    """
+    from .core.database import RosterDatabase
+
+    path = database_file_path(plugin_path)
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = RosterDatabase(path)
+            if not database.class_names():
+                for class_name, file_path in class_files(plugin_path).items():
+                    try:
+                        if os.path.exists(file_path):
+                            database.import_text(class_name, file_path)
+                    except Exception as e:
+                        print(f"导入名单 {file_path} 时出错: {e}")
+            _databases[path] = database
+    return database
+
+
+def roster_classes(plugin_path=None, storage=STORAGE_TEXT):
+    """所有班级名，默认班级在最前"""
+    if storage == STORAGE_SQLITE:
+        class_names = open_database(plugin_path).class_names()
+        return sorted(class_names, key=lambda name: name != DEFAULT_CLASS) or [DEFAULT_CLASS]
+    return list(class_files(plugin_path))
+
+
+def roster_store(class_name, plugin_path=None, storage=STORAGE_TEXT):
+    """班级对应的共享名单仓库(此处不读取名单)，班级不存在时使用默认班级"""
+    if storage == STORAGE_SQLITE:
+        from .core.database import DatabaseRosterSource
+
+        # 数据库在第一次读取名单时(后台加载线程中)才打开
+        source = DatabaseRosterSource(lambda: open_database(plugin_path), class_name)
+        return get_store(f"{database_file_path(plugin_path)}#{class_name}", load=False, source=source)
+    classes = class_files(plugin_path)
+    return get_store(classes.get(class_name, classes[DEFAULT_CLASS]), load=False)
+
+
+def history_file_path(plugin_path=None):
+    """点名历史日志路径"""
+    return os.path.join(plugin_path or os.path.dirname(__file__), "history.jsonl")
+
+
+class RosterWatcher(QObject):
+    """监视名单文件，变化时防抖后增量重新加载"""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.watcher = QFileSystemWatcher(self)
+        # 同时监视所在目录，编辑器"先删除再写入"保存时文件监视会失效
+        self.watcher.addPath(os.path.dirname(os.path.abspath(store.file_path)))
+        if os.path.exists(store.file_path):
+            self.watcher.addPath(store.file_path)
+        self.watcher.fileChanged.connect(self.schedule_reload)
+        self.watcher.directoryChanged.connect(self.schedule_reload)
+        # 目录中插件自己也在写入(配置、缓存、历史)，名单文件未变化时不重新读取
+        self.loaded_stamp = self.file_stamp()
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.timeout.connect(self.reload)
+
+    def schedule_reload(self, path=None):
+        self.debounce_timer.start(RELOAD_DEBOUNCE_MS)
+
+    def file_stamp(self):
+        """名单文件的 (mtime_ns, 大小)，文件不存在时为 None"""
+        try:
+            stat = os.stat(self.store.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        """名单文件变化时增量应用"""
+        file_path = self.store.file_path
+        stamp = self.file_stamp()
+        if stamp is None or stamp == self.loaded_stamp:
+            return
+        self.loaded_stamp = stamp
+        if file_path not in self.watcher.files():
+            self.watcher.addPath(file_path)
+        try:
+            diff = self.store.reload()
+            if diff:
+                added, removed, retiered = diff
+                if added or removed or retiered:
+                    print(f"名单已更新: 新增{len(added)}人, 删除{len(removed)}人, 调整{len(retiered)}人")
+        except Exception as e:
+            print(f"重新加载名单时出错: {e}")
+
+
+class AnimationScheduler(QObject):
+    """所有点名动画共用的调度器
+
+    动画开始时传入预先生成的帧时间表，由一个粗粒度计时器统一驱动；
+    同一个 key 再次开始时会取消之前的动画。计时器延迟导致多帧同时到期时
+    只显示最新一帧，并记录每帧的延迟。
+    """
+
+    def __init__(self, interval=ANIMATION_TICK_MS, parent=None):
+        super().__init__(parent)
+        self.animations = {}  # key -> [开始时刻, 出现时刻列表, 帧列表, 下一帧序号, 回调]
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self.interval = interval
+        self.stats = {"frames": 0, "dropped": 0, "late_total_ms": 0.0, "late_max_ms": 0.0}
+
+    def start(self, key, due_times, frames, on_frame):
+        """开始动画；on_frame(帧, 是否最后一帧)"""
+        self.animations[key] = [time.monotonic(), due_times, frames, 0, on_frame]
+        if not self.timer.isActive():
+            self.timer.start(self.interval)
+
+    def cancel(self, key):
+        self.animations.pop(key, None)
+        if not self.animations:
+            self.timer.stop()
+
+    def is_active(self, key):
+        return key in self.animations
+
+    def _tick(self):
+        now = time.monotonic()
+        for key, animation in list(self.animations.items()):
+            started, due_times, frames, index, on_frame = animation
+            elapsed_ms = (now - started) * 1000
+            if elapsed_ms < due_times[index]:
                 continue
-                
-            # 尝试获取概率等级，默认为3(普通)
+
+            # 跳过已经过期的中间帧，只显示最新一帧
+            latest = index
+            while latest + 1 < len(due_times) and due_times[latest + 1] <= elapsed_ms:
+                latest += 1
+            self.stats["dropped"] += latest - index
+            self._record_lateness(elapsed_ms - due_times[latest])
+
+            is_last = latest == len(frames) - 1
+            animation[3] = latest + 1
+            if is_last:
+                self.animations.pop(key, None)
             try:
-                probability = int(parts[1].strip()) if len(parts) > 1 else 3
-                # 确保概率在1-5范围内
-                probability = max(1, min(5, probability))
-            except:
-                probability = 3
-                
-            names.append([name, probability])
-            
-        return names
-    except Exception as e:
-        print(f"读取文件时出错: {e}")
-        return []
+                on_frame(frames[latest], is_last)
+            except Exception as e:
+                print(f"动画帧更新出错: {e}")
+                self.animations.pop(key, None)
 
+        if not self.animations:
+            self.timer.stop()
+
+    def _record_lateness(self, late_ms):
+        stats = self.stats
+        stats["frames"] += 1
+        stats["late_total_ms"] += late_ms
+        if late_ms > stats["late_max_ms"]:
+            stats["late_max_ms"] = late_ms
+
+
+_animation_scheduler = None
+
+
+def animation_scheduler():
+    """获取共享的动画调度器"""
+    global _animation_scheduler
+    if _animation_scheduler is None:
+        _animation_scheduler = AnimationScheduler()
+    return _animation_scheduler
+
+
+class RosterLoadSignals(QObject):
+    finished = pyqtSignal(object)
+
+
+class RosterLoadTask(QRunnable):
+    """在线程池中读取名单并构建抽取器"""
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+        self.signals = RosterLoadSignals()
+
+    def run(self):
+        try:
+            snapshot = self.store.build_snapshot()
+        except Exception as e:
+            print(f"后台加载名单时出错: {e}")
+            snapshot = None
+        self.signals.finished.emit(snapshot)
+
+
+class SimulationSignals(QObject):
+    finished = pyqtSignal(int, object)  # (模拟编号, simulate_pool 的结果)
 
-def save_names_to_file(file_path, names):
-    """保存名单到文件"""
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            for name_data in names:
-                if isinstance(name_data, list) and len(name_data) >= 2:
-                    f.write(f"{name_data[0]},{name_data[1]}\n")
-                else:
-                    f.write(f"{name_data},3\n")  # 默认概率为3
-    except Exception as e:
-        print(f"保存文件时出错: {e}")
+
+class SimulationTask(QRunnable):
+    """在线程池中模拟洗牌池点名，预估每位学生的点名频率"""
+
+    def __init__(self, generation, names_data):
+        super().__init__()
+        self.generation = generation
+        self.names_data = names_data
+        self.signals = SimulationSignals()
+
+    def run(self):
+        try:
+            result = simulate_pool(self.names_data)
+        except Exception as e:
+            print(f"模拟点名频率时出错: {e}")
+            result = None
+        self.signals.finished.emit(self.generation, result)
+
+
+class RosterImportSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)  # 导入的名单，取消或出错时为 None
+    failed = pyqtSignal(str)
+
+
+class RosterImportTask(QRunnable):
+    """在线程池中流式导入名单文件，可随时取消"""
+
+    def __init__(self, importer):
+        super().__init__()
+        self.importer = importer
+        self.signals = RosterImportSignals()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        names_data = None
+        try:
+            names_data = self.importer.run(self.signals.progress.emit, self.cancelled.is_set)
+        except ImportCancelled:
+            pass
+        except Exception as e:
+            print(f"导入名单时出错: {e}")
+            self.signals.failed.emit(str(e))
+        self.signals.finished.emit(names_data)
 
 
 class FloatingWindow(QWidget):
     closed = pyqtSignal()
     name_selected = pyqtSignal(str)
+    names_selected = pyqtSignal(list)
 
     def __init__(self):
         super().__init__()
-        self.shuffled_names = []
-        self.current_index = 0
-        self.selected_history = []  # 记录已选择的学生
-        self.load_names()
+        self.started_at = time.perf_counter()
+        self.startup_timings = {}  # 启动各阶段耗时(毫秒)
+        self.selected_history = get_history(history_file_path())  # 记录已选择的学生
+        self.config = get_config(os.path.dirname(__file__), CONFIG_FILE, DEFAULT_CONFIG)
+        self.store = None
+        self.current_class = None
+        self.roster_watcher = None
         self.drag_pos = QPoint()
         self.mouse_press_pos = QPoint()
+        self.mouse_press_time = 0
         self.name_dialog = None
         self.init_ui()
+        self.startup_timings["ui_ms"] = (time.perf_counter() - self.started_at) * 1000
+        self.switch_class(self.config["current_class"] or DEFAULT_CLASS)
+
+    def switch_class(self, class_name):
+        """切换班级
+
+        已缓存的班级直接复用其名单和抽取器(保留本轮"不重复"抽取的进度)，
+        未缓存的班级在后台加载。
+        """
+        storage = self.config["storage"] or STORAGE_TEXT
+        # 数据库尚未打开时不在界面线程中打开，加载完成后再确认班级存在
+        if storage != STORAGE_SQLITE or database_opened():
+            if class_name not in roster_classes(storage=storage):
+                class_name = DEFAULT_CLASS
+        if self.store is not None:
+            self.store.unsubscribe(self.on_store_changed)
+            self.started_at = time.perf_counter()
+            self.startup_timings = {}
+        if self.roster_watcher is not None:
+            self.roster_watcher.deleteLater()
+            self.roster_watcher = None
+
+        self.store = roster_store(class_name, storage=storage)
+        # 订阅同时使当前班级的仓库不会被缓存释放
+        self.store.subscribe(self.on_store_changed)
+        self.store.set_draw_mode(self.config["draw_mode"] or DEFAULT_MODE)
+        self.current_class = class_name
+        self.config["current_class"] = class_name
+        self.start_loading()
+
+    def start_loading(self):
+        """在后台加载名单，加载期间悬浮按钮显示为加载状态"""
+        store = self.store
+        if store.loaded:
+            self.on_roster_loaded(None, store)
+            return
+        self.set_loading(True)
+        self.load_task = RosterLoadTask(store)
+        self.load_task.signals.finished.connect(lambda snapshot: self.on_roster_loaded(snapshot, store))
+        QThreadPool.globalInstance().start(self.load_task)
+
+    def on_roster_loaded(self, snapshot, store):
+        """后台加载完成后(在界面线程中)替换名单"""
+        install_start = time.perf_counter()
+        if snapshot is not None:
+            store.install(snapshot)
+            self.startup_timings["read_ms"] = snapshot["read_ms"]
+            self.startup_timings["build_ms"] = snapshot["build_ms"]
+        else:
+            # 后台加载失败或已被其他组件加载
+            store.ensure_loaded()
+        if store is not self.store:
+            return  # 加载期间已切换到其他班级，结果保留在缓存中
+        if (self.config["storage"] == STORAGE_SQLITE and self.current_class != DEFAULT_CLASS
+                and self.current_class not in roster_classes(storage=STORAGE_SQLITE)):
+            # 配置中的班级已不在数据库中
+            self.switch_class(DEFAULT_CLASS)
+            return
+        self.startup_timings["install_ms"] = (time.perf_counter() - install_start) * 1000
+        self.startup_timings["total_ms"] = (time.perf_counter() - self.started_at) * 1000
+
+        # 数据库中的名单只通过插件修改，不需要监视文件
+        if self.roster_watcher is None and isinstance(self.store.source, TextRosterSource):
+            self.roster_watcher = RosterWatcher(self.store, self)
+        self.set_loading(False)
+        self.on_store_changed(self.store)
+        print("名单加载完成: {} {}人, {}".format(
+            self.current_class,
+            len(self.store.names),
+            ", ".join(f"{phase} {ms:.1f} ms" for phase, ms in self.startup_timings.items())
+        ))
+
+    def on_store_changed(self, store):
+        tooltip = f"{self.current_class}: {len(store.names)}人"
+        if store.absent:
+            tooltip += f", 缺勤{len(store.absent)}人"
+        self.label.setToolTip(tooltip)
+
+    def set_loading(self, loading):
+        self.label.setText("载入" if loading else "点名")
 
     def init_ui(self):
         """初始化界面组件"""
@@ -122,51 +528,28 @@ class FloatingWindow(QWidget):
         self.setFixedSize(50, 40)
         self.move_to_corner()
 
+    @property
+    def names(self):
+        """名字列表(不含概率信息)"""
+        return self.store.names
+
+    @property
+    def names_data(self):
+        return self.store.names_data
+
     def load_names(self):
-        """加载名单并初始化洗牌队列"""
-        file_path = os.path.join(os.path.dirname(__file__), "names.txt")
-        self.names_data = read_names_from_file(file_path)
-        # 提取名字列表(不含概率信息)
-        self.names = [item[0] for item in self.names_data]
-        self.reset_shuffle()
+        """从文件重新加载名单并初始化洗牌队列"""
+        self.store.reload()
 
     def reset_shuffle(self):
         """根据概率权重创建抽取池"""
-        # 创建一个加权抽取池
-        self.weighted_pool = []
-        
-        # 概率等级对应的权重
-        probability_weights = {
-            1: 0,     # 不可能 - 权重为0
-            2: 10,    # 小概率 - 权重为10
-            3: 30,    # 普通 - 权重为30
-            4: 60,    # 大概率 - 权重为60
-            5: 100    # 绝对 - 权重为100
-        }
-        
-        # 是否有"绝对"级别的学生
-        has_absolute = any(item[1] == 5 for item in self.names_data)
-        
-        for name_data in self.names_data:
-            name = name_data[0]
-            probability = name_data[1]
-            
-            # 如果存在"绝对"级别的学生，且当前学生不是"绝对"级别，则不加入池中
-            if has_absolute and probability < 5:
-                continue
-                
-            # 根据权重将学生名字添加到抽取池中
-            weight = probability_weights.get(probability, 30)
-            for _ in range(weight):
-                self.weighted_pool.append(name)
-                
-        # 如果抽取池为空(可能全是"不可能"级别)，添加所有名字各一次
-        if not self.weighted_pool:
-            self.weighted_pool = self.names.copy()
-            
-        # 打乱抽取池
-        random.shuffle(self.weighted_pool)
-        self.current_index = 0
+        # 抽取池仅保存每位学生的剩余次数，不再按权重展开整个名单
+        self.store.reset_sampler()
+
+    def set_draw_mode(self, mode):
+        """切换抽取模式并重建抽取池(所有已缓存的班级)"""
+        self.config["draw_mode"] = mode
+        set_all_draw_modes(mode)
 
     def move_to_corner(self):
         """移动窗口到屏幕右下角"""
@@ -180,6 +563,7 @@ class FloatingWindow(QWidget):
         if event.button() == Qt.LeftButton:
             self.drag_pos = event.globalPos() - self.frameGeometry().topLeft()
             self.mouse_press_pos = event.globalPos()
+            self.mouse_press_time = event.timestamp()
             event.accept()
 
     def mouseMoveEvent(self, event: QMouseEvent):
@@ -188,33 +572,109 @@ class FloatingWindow(QWidget):
             event.accept()
 
     def mouseReleaseEvent(self, event: QMouseEvent):
-        if event.button() == Qt.LeftButton:
+        if event.button() == Qt.LeftButton and not self.store.loaded:
+            # 名单加载完成前只允许拖动
+            event.accept()
+        elif event.button() == Qt.LeftButton:
             if (event.globalPos() - self.mouse_press_pos).manhattanLength() <= QApplication.startDragDistance():
-                self.show_random_name()
+                # Ctrl+单击或长按进入批量点名
+                long_press = event.timestamp() - self.mouse_press_time >= LONG_PRESS_MS
+                if long_press or event.modifiers() & Qt.ControlModifier:
+                    self.show_batch_names()
+                else:
+                    self.show_random_name()
             event.accept()
 
+    def contextMenuEvent(self, event):
+        """右键菜单：批量点名与分组"""
+        if not self.store.loaded:
+            return
+        from qfluentwidgets import RoundMenu
+
+        menu = RoundMenu(parent=self)
+        batch_action = QAction("批量点名", self)
+        batch_action.triggered.connect(self.show_batch_names)
+        team_action = QAction("随机分组", self)
+        team_action.triggered.connect(self.show_teams)
+        attendance_action = QAction("考勤", self)
+        attendance_action.triggered.connect(self.show_attendance)
+        menu.addAction(batch_action)
+        menu.addAction(team_action)
+        menu.addAction(attendance_action)
+
+        classes = roster_classes(storage=self.config["storage"] or STORAGE_TEXT)
+        if len(classes) > 1:
+            class_menu = RoundMenu("切换班级", self)
+            for class_name in classes:
+                action = QAction(class_name, self)
+                action.setCheckable(True)
+                action.setChecked(class_name == self.current_class)
+                action.triggered.connect(lambda checked, name=class_name: self.switch_class(name))
+                class_menu.addAction(action)
+            menu.addSeparator()
+            menu.addMenu(class_menu)
+        menu.exec_(event.globalPos())
+
     def show_random_name(self):
         """触发随机点名"""
         name = self.get_next_name()
         # 发出信号而不是显示对话框
         self.name_selected.emit(name)
 
+    def show_batch_names(self):
+        """触发批量点名"""
+        # 与单次点名规则相同：有"绝对"级别的学生时只从他们中抽取，"不可能"级别的学生不会入选
+        limit = self.store.drawable_count()
+        label = "抽取人数：" if limit == len(self.names) else f"抽取人数(按当前概率设置最多 {limit} 人)："
+        count, ok = QInputDialog.getInt(self, "批量点名", label, min(5, max(1, limit)), 1, max(1, limit))
+        if not ok:
+            return
+        names = self.get_next_names(count)
+        if names:
+            self.names_selected.emit(names)
+
+    def show_teams(self):
+        """将名单分组并显示结果"""
+        if not self.names:
+            return
+        count, ok = QInputDialog.getInt(self, "随机分组", "分组数量：", 2, 1, max(1, len(self.names)))
+        if not ok:
+            return
+        teams = split_into_teams(self.store.present_names_data(), count)
+
+        # 分组结果也记入历史
+        self.selected_history.record_teams(teams)
+
+        dialog = TeamDialog(teams, self)
+        dialog.exec_()
+
+    def show_attendance(self):
+        """标记本节课缺勤的学生"""
+        dialog = AttendanceDialog(self.store, self)
+        dialog.exec_()
+
+    def end_attendance_session(self):
+        """下课后清除缺勤标记(所有已缓存的班级)"""
+        end_all_attendance()
+
+    def get_next_names(self, count):
+        """一次抽取多位互不重复的学生"""
+        names = self.store.draw_distinct(count)
+        self.selected_history.record_many(names)
+        self.store.source.record_draws(names)
+        return names
+
     def get_next_name(self):
         """从加权池中获取下一个名字"""
-        if not self.weighted_pool:
+        if not self.store.sampler:
             return "名单为空"
 
-        if self.current_index >= len(self.weighted_pool):
-            self.reset_shuffle()
-
-        name = self.weighted_pool[self.current_index]
-        self.current_index += 1
+        # 本轮抽完后抽取池会自动开始新一轮
+        name = self.store.draw()
         
         # 记录选择历史
-        self.selected_history.append(name)
-        if len(self.selected_history) > 10:
-            self.selected_history.pop(0)
-            
+        self.selected_history.record(name)
+        self.store.source.record_draws([name])
         return name
 
     def closeEvent(self, event):
@@ -222,19 +682,104 @@ class FloatingWindow(QWidget):
         super().closeEvent(event)
 
 
+class NamePixmapCache:
+    """预渲染的名字图像缓存，按占用字节数做 LRU 淘汰
+
+    后台线程只生成 QImage；界面线程首次使用时转换为 QPixmap 并替换缓存项。
+    """
+
+    def __init__(self, max_bytes=NAME_PIXMAP_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (QImage 或 QPixmap, 字节数)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def put(self, key, image):
+        """放入后台线程生成的 QImage，超出容量时淘汰最久未使用的项"""
+        size = image.height() * image.bytesPerLine()
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.total_bytes -= old[1]
+            self.entries[key] = (image, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def pixmap(self, key):
+        """取出缓存的图像(仅在界面线程调用)，未缓存时返回 None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            image, size = entry
+        if isinstance(image, QImage):
+            image = QPixmap.fromImage(image)
+            with self.lock:
+                if key in self.entries:
+                    self.entries[key] = (image, size)
+        return image
+
+
+def render_name_image(text, width, height, device_ratio, family, pixel_size, color):
+    """把名字绘制到透明 QImage 上，名字过长时缩小字号以适应宽度"""
+    image = QImage(int(width * device_ratio), int(height * device_ratio), QImage.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(device_ratio)
+    image.fill(Qt.transparent)
+
+    font = QFont(family)
+    font.setPixelSize(pixel_size)
+    metrics = QFontMetrics(font)
+    text_width = metrics.horizontalAdvance(text) if hasattr(metrics, "horizontalAdvance") else metrics.width(text)
+    if text_width > width > 0:
+        font.setPixelSize(max(12, int(pixel_size * width / text_width)))
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    painter.setFont(font)
+    painter.setPen(QColor(color))
+    painter.drawText(0, 0, width, height, Qt.AlignCenter, text)
+    painter.end()
+    return image
+
+
+class NameRenderTask(QRunnable):
+    """在线程池中预渲染一组名字"""
+
+    def __init__(self, cache, names, style):
+        super().__init__()
+        self.cache = cache
+        self.names = names
+        self.style = style  # (宽, 高, 设备像素比, 字体, 像素字号, 颜色)
+
+    def run(self):
+        for name in self.names:
+            key = (name,) + self.style
+            if key not in self.cache:
+                self.cache.put(key, render_name_image(name, *self.style))
+
+
+_name_pixmap_cache = NamePixmapCache()
+
+
 class NameDialog(QDialog):
     def __init__(self, name, parent=None):
         super().__init__(parent)
         self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
-        self.animation_names = []
-        self.timer = None
         self.final_name = name
-        self.animation_count = 0
         self.init_ui(name)
         self.move_center()
         
     def init_ui(self, name):
         """初始化结果显示对话框"""
+        from qfluentwidgets import DisplayLabel, PushButton
+
         self.setWindowTitle("随机点名结果")
         self.resize(600, 400)
         layout = QVBoxLayout(self)
@@ -263,42 +808,355 @@ class NameDialog(QDialog):
 
     def start_animation(self):
         """开始动画效果"""
-        # 准备用于动画显示的随机名字
-        file_path = os.path.join(os.path.dirname(__file__), "names.txt")
-        all_names = read_names_from_file(file_path)
-        self.animation_names = all_names
-        random.shuffle(self.animation_names)
-        
-        self.animation_count = 0
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_animation)
-        self.timer.start(80)  # 初始速度较快
+        # 动画使用内存中的名单，帧时间表和过渡名字在开始时一次生成
+        parent = self.parent()
+        names = parent.names if isinstance(parent, FloatingWindow) else get_store(names_file_path()).names
+        due_times, frames = build_frames(names, self.final_name, DIALOG_ANIMATION_FRAMES)
+
+        # 在后台线程预渲染本次动画要显示的名字，帧更新时直接贴图
+        self.render_style = self.name_render_style()
+        QThreadPool.globalInstance().start(
+            NameRenderTask(_name_pixmap_cache, list(dict.fromkeys(frames)), self.render_style)
+        )
+        animation_scheduler().start(self, due_times, frames, self.update_animation)
+
+    def name_render_style(self):
+        """当前对话框下名字图像的尺寸、字体与颜色"""
+        size = self.name_label.size()
+        font = self.name_label.font()
+        pixel_size = font.pixelSize()
+        if pixel_size <= 0:
+            pixel_size = int(font.pointSizeF() * self.logicalDpiY() / 72)
+        from qfluentwidgets import isDarkTheme
+
+        color = "#ffffff" if isDarkTheme() else "#000000"
+        return (size.width(), size.height(), self.devicePixelRatioF(), font.family(), pixel_size, color)
         
-    def update_animation(self):
-        """更新动画显示"""
-        if self.animation_count < 12:
-            # 随机显示一个名字
-            name = random.choice(self.animation_names)
+    def update_animation(self, name, is_last):
+        """更新动画显示，已预渲染的名字直接贴图"""
+        pixmap = _name_pixmap_cache.pixmap((name,) + self.render_style)
+        if pixmap is not None:
+            self.name_label.setPixmap(pixmap)
+        else:
             self.name_label.setText(name)
-            self.animation_count += 1
-            # 逐渐减慢动画速度
-            delay = 80 + int(self.animation_count * 20)
-            self.timer.start(delay)
+
+    def done(self, result):
+        animation_scheduler().cancel(self)
+        super().done(result)
+
+
+class TeamDialog(QDialog):
+    def __init__(self, teams, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
+        self.setWindowTitle("随机分组结果")
+        self.resize(600, 400)
+        self.init_ui(teams)
+
+    def init_ui(self, teams):
+        """初始化分组结果对话框"""
+        from qfluentwidgets import PushButton
+
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(3)
+        self.table.setHorizontalHeaderLabels(["组别", "人数", "成员"])
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setWordWrap(True)
+
+        self.table.setRowCount(len(teams))
+        for row, team in enumerate(teams):
+            self.table.setItem(row, 0, QTableWidgetItem(f"第{row + 1}组"))
+            self.table.setItem(row, 1, QTableWidgetItem(str(len(team))))
+            self.table.setItem(row, 2, QTableWidgetItem("、".join(item[0] for item in team)))
+        self.table.resizeRowsToContents()
+        layout.addWidget(self.table)
+
+        self.confirm_btn = PushButton("确定")
+        self.confirm_btn.setFixedSize(100, 40)
+        self.confirm_btn.clicked.connect(self.close)
+        layout.addWidget(self.confirm_btn, alignment=Qt.AlignCenter)
+
+
+class HistoryDialog(QDialog):
+    """分页显示点名历史，每页只创建 HISTORY_PAGE_SIZE 个列表项"""
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.page_number = 0
+        self.setWindowTitle("点名历史记录")
+        self.resize(360, 480)
+        self.init_ui()
+        self.show_page(0)
+
+    def init_ui(self):
+        from qfluentwidgets import PushButton
+
+        layout = QVBoxLayout(self)
+        self.list_widget = QListWidget()
+        self.list_widget.setFont(QFont("微软雅黑", 12))
+        layout.addWidget(self.list_widget)
+
+        page_layout = QHBoxLayout()
+        self.prev_btn = PushButton("上一页")
+        self.prev_btn.clicked.connect(lambda: self.show_page(self.page_number - 1))
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+        self.next_btn = PushButton("下一页")
+        self.next_btn.clicked.connect(lambda: self.show_page(self.page_number + 1))
+        page_layout.addWidget(self.prev_btn)
+        page_layout.addWidget(self.page_label, 1)
+        page_layout.addWidget(self.next_btn)
+        layout.addLayout(page_layout)
+
+        close_btn = PushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        layout.addWidget(close_btn, alignment=Qt.AlignCenter)
+
+    def page_count(self):
+        return max(1, -(-len(self.history) // HISTORY_PAGE_SIZE))
+
+    def show_page(self, number):
+        """显示第 number 页(从0开始)，最新的记录在前"""
+        self.page_number = max(0, min(number, self.page_count() - 1))
+        self.list_widget.clear()
+        entries = self.history.page(self.page_number, HISTORY_PAGE_SIZE)
+        if not entries:
+            self.list_widget.addItem("暂无点名记录")
+        for seq, timestamp, kind, text in entries:
+            item = QListWidgetItem(f"{datetime.fromtimestamp(timestamp):%m-%d %H:%M}  {text}")
+            if kind == KIND_NAME:
+                item.setToolTip(f"累计被点到 {self.history.count(text)} 次")
+            self.list_widget.addItem(item)
+
+        self.page_label.setText(f"第 {self.page_number + 1}/{self.page_count()} 页")
+        self.prev_btn.setEnabled(self.page_number > 0)
+        self.next_btn.setEnabled(self.page_number < self.page_count() - 1)
+
+
+class AttendanceDialog(QDialog):
+    """本节课的考勤：勾选表示出勤，取消勾选的学生不会被点到，下课后自动恢复"""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.search_index = NameSearchIndex(store.names)
+        self.setWindowTitle("考勤")
+        self.resize(300, 480)
+        self.init_ui()
+
+    def init_ui(self):
+        from qfluentwidgets import LineEdit, PushButton
+
+        layout = QVBoxLayout(self)
+        self.search_edit = LineEdit()
+        self.search_edit.setPlaceholderText("搜索姓名或拼音首字母")
+        self.search_edit.textChanged.connect(self.apply_filter)
+        layout.addWidget(self.search_edit)
+
+        self.list_widget = QListWidget()
+        self.list_widget.setFont(QFont("微软雅黑", 12))
+        for name in self.store.names:
+            item = QListWidgetItem(name)
+            # 不设 ItemIsUserCheckable：复选框只用于显示，切换统一由单击整行处理，
+            # 否则单击复选框时视图与 itemClicked 各切换一次，结果不变
+            item.setCheckState(Qt.Unchecked if name in self.store.absent else Qt.Checked)
+            self.list_widget.addItem(item)
+        self.list_widget.itemChanged.connect(self.on_item_changed)
+        # 单击整行(包括复选框)即可切换，便于快速点选
+        self.list_widget.itemClicked.connect(self.toggle_item)
+        layout.addWidget(self.list_widget)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.update_summary()
+
+        button_layout = QHBoxLayout()
+        reset_btn = PushButton("全部出勤")
+        reset_btn.clicked.connect(self.reset_attendance)
+        close_btn = PushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        button_layout.addWidget(reset_btn)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+    def apply_filter(self, text):
+        """只显示名字、全拼或拼音首字母以输入内容开头的学生"""
+        rows = self.search_index.search(text) if text.strip() else None
+        for row in range(self.list_widget.count()):
+            self.list_widget.item(row).setHidden(rows is not None and row not in rows)
+
+    def toggle_item(self, item):
+        checked = item.checkState() == Qt.Checked
+        item.setCheckState(Qt.Unchecked if checked else Qt.Checked)
+
+    def on_item_changed(self, item):
+        self.store.set_absent(item.text(), item.checkState() != Qt.Checked)
+        self.update_summary()
+
+    def reset_attendance(self):
+        self.store.end_attendance()
+        self.list_widget.blockSignals(True)
+        for row in range(self.list_widget.count()):
+            self.list_widget.item(row).setCheckState(Qt.Checked)
+        self.list_widget.blockSignals(False)
+        self.update_summary()
+
+    def update_summary(self):
+        absent = len(self.store.absent)
+        self.summary_label.setText(f"出勤 {len(self.store.names) - absent} 人，缺勤 {absent} 人")
+
+
+class RosterTableModel(QAbstractTableModel):
+    """直接读取名单数组的表格模型，修改只记录在变更表中，保存时才写回"""
+
+    HEADERS = ["学生姓名", "概率等级(1-5)", f"每{DEFAULT_DRAWS}次约点到"]
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.reload()
+
+    def reload(self):
+        """从名单仓库重新读取，丢弃未保存的修改"""
+        self.beginResetModel()
+        self.names = self.store.roster.names
+        self.tiers = self.store.roster.tiers
+        self.dirty_names = {}  # 行号 -> 修改后的名字
+        self.dirty_tiers = {}  # 行号 -> 修改后的概率等级
+        self.frequencies = None  # 模拟得到的每位学生的点名频率
+        self._prefix_index = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        if index.column() == 2:
+            return super().flags(index)
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def name(self, row):
+        return self.dirty_names.get(row, self.names[row])
+
+    def tier(self, row):
+        return self.dirty_tiers.get(row, self.tiers[row])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        if index.column() == 0:
+            return self.name(index.row())
+        if index.column() == 2:
+            if self.frequencies is None or index.row() >= len(self.frequencies):
+                return ""
+            return f"{self.frequencies[index.row()]:.2f} 次"
+        return str(self.tier(index.row()))
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or index.column() == 2:
+            return False
+        row = index.row()
+        if index.column() == 0:
+            self._set_dirty(self.dirty_names, row, str(value).strip(), self.names[row])
+            self._prefix_index = None
         else:
-            # 动画结束，显示最终结果
-            self.timer.stop()
-            self.name_label.setText(self.final_name)
+            try:
+                # 确保概率在1-5范围内
+                tier = max(1, min(5, int(value)))
+            except:
+                tier = 3
+            self._set_dirty(self.dirty_tiers, row, tier, self.tiers[row])
+        self.dataChanged.emit(index, index)
+        return True
 
+    @staticmethod
+    def _set_dirty(changes, row, value, original):
+        if value == original:
+            changes.pop(row, None)
+        else:
+            changes[row] = value
+
+    def set_tier_for_rows(self, rows, tier):
+        """批量设置多行的概率等级"""
+        if not rows:
+            return
+        for row in rows:
+            self._set_dirty(self.dirty_tiers, row, tier, self.tiers[row])
+        self.dataChanged.emit(self.index(min(rows), 1), self.index(max(rows), 1))
+
+    def is_dirty(self):
+        return bool(self.dirty_names or self.dirty_tiers)
+
+    def current_rows(self):
+        """包含未保存修改的名单，行号与表格一致"""
+        return [[self.name(row), self.tier(row)] for row in range(len(self.names))]
+
+    def set_frequencies(self, frequencies):
+        self.frequencies = frequencies
+        if self.names:
+            self.dataChanged.emit(self.index(0, 2), self.index(len(self.names) - 1, 2))
+
+    def rows_with_prefix(self, prefix):
+        """返回名字(或其拼音)以 prefix 开头(不区分大小写)的行号集合"""
+        if self._prefix_index is None:
+            self._prefix_index = NameSearchIndex([self.name(row) for row in range(len(self.names))])
+        return self._prefix_index.search(prefix)
+
+    def names_data(self):
+        """合并修改后的完整名单，名字为空的行会被删除"""
+        return [[self.name(row), self.tier(row)] for row in range(len(self.names)) if self.name(row)]
+
+
+class RosterFilterProxyModel(QSortFilterProxyModel):
+    """按名字前缀和概率等级筛选"""
 
-class ProbabilitySettingDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.prefix_rows = None  # None 表示不按名字筛选
+        self.tier = 0            # 0 表示所有等级
+
+    def set_filter(self, prefix, tier):
+        prefix = prefix.strip()
+        self.prefix_rows = self.sourceModel().rows_with_prefix(prefix) if prefix else None
+        self.tier = tier
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.prefix_rows is not None and source_row not in self.prefix_rows:
+            return False
+        return not self.tier or self.sourceModel().tier(source_row) == self.tier
+
+
+class ProbabilitySettingDialog(QDialog):
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
         self.setWindowTitle("点名概率设置")
-        self.resize(500, 600)
+        self.resize(560, 640)
+        self.simulation_generation = 0
+        self.simulation_timer = QTimer(self)
+        self.simulation_timer.setSingleShot(True)
+        self.simulation_timer.setInterval(SIMULATION_DELAY_MS)
+        self.simulation_timer.timeout.connect(self.start_simulation)
         self.setup_ui()
         self.load_names()
+        self.store.subscribe(self.on_roster_changed)
         
     def setup_ui(self):
+        from qfluentwidgets import ComboBox, LineEdit, PushButton
+
         layout = QVBoxLayout(self)
         
         # 添加说明标签
@@ -316,13 +1174,48 @@ class ProbabilitySettingDialog(QDialog):
         )
         prob_desc.setFont(QFont("微软雅黑", 9))
         layout.addWidget(prob_desc)
+
+        # 筛选区域
+        filter_layout = QHBoxLayout()
+        self.search_edit = LineEdit()
+        self.search_edit.setPlaceholderText("按姓名开头搜索")
+        self.search_edit.textChanged.connect(self.apply_filter)
+        self.tier_filter = ComboBox()
+        self.tier_filter.addItems(["全部等级"] + [f"等级 {tier}" for tier in range(1, 6)])
+        self.tier_filter.currentIndexChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.search_edit)
+        filter_layout.addWidget(self.tier_filter)
+        layout.addLayout(filter_layout)
         
-        # 创建表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["学生姓名", "概率等级(1-5)"])
+        # 创建表格，只渲染可见的行
+        self.model = RosterTableModel(self.store, self)
+        self.proxy = RosterFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(28)
         layout.addWidget(self.table)
+        # 修改等级后重新模拟点名频率
+        self.model.dataChanged.connect(self.schedule_simulation)
+
+        self.simulation_label = QLabel()
+        self.simulation_label.setFont(QFont("微软雅黑", 9))
+        self.simulation_label.setWordWrap(True)
+        layout.addWidget(self.simulation_label)
+
+        # 批量设置区域
+        bulk_layout = QHBoxLayout()
+        self.bulk_tier_box = ComboBox()
+        self.bulk_tier_box.addItems([f"等级 {tier}" for tier in range(1, 6)])
+        self.bulk_tier_box.setCurrentIndex(2)
+        self.bulk_btn = PushButton("设为所选学生的等级")
+        self.bulk_btn.clicked.connect(self.set_tier_for_selection)
+        bulk_layout.addWidget(self.bulk_tier_box)
+        bulk_layout.addWidget(self.bulk_btn)
+        layout.addLayout(bulk_layout)
         
         # 按钮区域
         button_layout = QHBoxLayout()
@@ -339,55 +1232,361 @@ class ProbabilitySettingDialog(QDialog):
         layout.addLayout(button_layout)
         
     def load_names(self):
-        file_path = os.path.join(os.path.dirname(__file__), "names.txt")
-        self.names_data = read_names_from_file(file_path)
-        
-        # 填充表格
-        self.table.setRowCount(len(self.names_data))
-        for row, name_data in enumerate(self.names_data):
-            name_item = QTableWidgetItem(name_data[0])
-            self.table.setItem(row, 0, name_item)
-            
-            prob_item = QTableWidgetItem(str(name_data[1]))
-            self.table.setItem(row, 1, prob_item)
+        self.loaded_version = self.store.version
+        self.model.reload()
+        self.apply_filter()
+        self.schedule_simulation()
+
+    def schedule_simulation(self, top_left=None, *args):
+        # 模拟结果写回频率列时也会触发 dataChanged，忽略
+        if top_left is not None and top_left.column() == 2:
+            return
+        self.simulation_timer.start()
+
+    def start_simulation(self):
+        """在后台模拟当前(含未保存修改的)概率设置，较早的模拟结果被丢弃"""
+        self.simulation_generation += 1
+        self.simulation_task = SimulationTask(self.simulation_generation, self.model.current_rows())
+        self.simulation_task.signals.finished.connect(self.on_simulation_finished)
+        QThreadPool.globalInstance().start(self.simulation_task)
+
+    def on_simulation_finished(self, generation, result):
+        if generation != self.simulation_generation:
+            return
+        if result is None:
+            self.model.set_frequencies(None)
+            self.simulation_label.setText("名单中没有可以被点到的学生")
+            return
+        self.model.set_frequencies(result["frequencies"])
+        text = (
+            f"按洗牌池模式估算：一轮共 {result['round_size']} 次点名，"
+            f"全班平均约 {result['coverage_mean']:.0f} 次点名后都被点到过"
+            f"(90%的情况下不超过 {result['coverage_p90']} 次)。"
+        )
+        excluded = len(self.model.names) - result["eligible"]
+        if excluded:
+            text += f"\n{excluded} 人不会被点到(等级1，或名单中有等级5的学生)。"
+        if self.store.draw_mode != "pool":
+            text += "\n当前为公平模式，实际频率会更均匀。"
+        self.simulation_label.setText(text)
+
+    def on_roster_changed(self, store):
+        """名单在外部被修改时刷新表格
+
+        考勤变化(包括下课时自动清除)也会通知，但版本号不变，不能因此丢弃未保存的修改。
+        """
+        if store.version == self.loaded_version:
+            return
+        self.load_names()
+
+    def apply_filter(self, *args):
+        self.proxy.set_filter(self.search_edit.text(), self.tier_filter.currentIndex())
+
+    def set_tier_for_selection(self):
+        """将所选学生设为同一概率等级"""
+        rows = [self.proxy.mapToSource(index).row() for index in self.table.selectionModel().selectedRows()]
+        self.model.set_tier_for_rows(rows, self.bulk_tier_box.currentIndex() + 1)
             
     def save_settings(self):
-        # 收集表格中的数据
-        updated_data = []
-        for row in range(self.table.rowCount()):
-            name = self.table.item(row, 0).text().strip()
-            if not name:
-                continue
-                
-            try:
-                prob = int(self.table.item(row, 1).text())
-                # 确保概率在1-5范围内
-                prob = max(1, min(5, prob))
-            except:
-                prob = 3
-                
-            updated_data.append([name, prob])
-            
-        # 保存到文件
-        file_path = os.path.join(os.path.dirname(__file__), "names.txt")
-        save_names_to_file(file_path, updated_data)
+        # 只有改名或删除时才需要整体保存，否则只写回变化的行
+        if self.model.dirty_names:
+            self.store.save(self.model.names_data())
+        elif self.model.dirty_tiers:
+            self.store.set_tiers(self.model.dirty_tiers)
         
         self.accept()
 
+    def done(self, result):
+        self.store.unsubscribe(self.on_roster_changed)
+        self.simulation_timer.stop()
+        self.simulation_generation += 1  # 丢弃尚未返回的模拟结果
+        super().done(result)
+
+
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def contexts_signature(cw_contexts):
+    """cw_contexts 的浅层签名：标量按值比较，其余按对象身份比较，不做深度比较"""
+    if not isinstance(cw_contexts, dict):
+        return id(cw_contexts)
+    return tuple(
+        (key, value if isinstance(value, _SCALAR_TYPES) else id(value))
+        for key, value in cw_contexts.items()
+    )
+
+
+class HostCallQueue(QObject):
+    """发往宿主 method 的异步调用队列
+
+    同一小组件的连续内容更新只保留最后一次，按刷新间隔统一发送；
+    通知排队后在后续事件循环中逐条发送，不占用动画帧回调的时间。
+    需要返回值或顺序敏感的调用(注册、查询、调整宽度)仍直接同步调用。
+    内容更新发送失败时发出 content_failed(widget_code)，由发起方决定如何重写；
+    通知发送失败时重新排队，最多重试 HOST_NOTIFICATION_RETRIES 次。
+    """
+
+    content_failed = pyqtSignal(str)
+
+    def __init__(self, method, interval=HOST_FLUSH_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.method = method
+        self.interval = interval
+        self.pending_content = OrderedDict()  # widget_code -> (标题, 内容, 入队时刻)
+        self.pending_notifications = deque()  # (参数, 入队时刻, 已重试次数)
+        self.last_flush = 0.0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.stats = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "dispatched": 0,
+            "failed": 0,
+            "max_depth": 0,
+            "latency_total_ms": 0.0,
+            "latency_max_ms": 0.0,
+            "call_max_ms": 0.0,
+        }
+
+    def register_widget(self, **kwargs):
+        return self.method.register_widget(**kwargs)
+
+    def get_widget(self, widget_code):
+        return self.method.get_widget(widget_code)
+
+    def adjust_widget_width(self, **kwargs):
+        return self.method.adjust_widget_width(**kwargs)
+
+    def change_widget_content(self, widget_code, title, content):
+        """排队更新小组件内容，同一小组件未发送的旧内容会被覆盖"""
+        self.stats["enqueued"] += 1
+        previous = self.pending_content.get(widget_code)
+        if previous:
+            self.stats["coalesced"] += 1
+            enqueued_at = previous[2]
+        else:
+            enqueued_at = time.perf_counter()
+        self.pending_content[widget_code] = (title, content, enqueued_at)
+        self._schedule()
+
+    def send_notification(self, **kwargs):
+        """排队发送通知"""
+        self.stats["enqueued"] += 1
+        self.pending_notifications.append((kwargs, time.perf_counter(), 0))
+        self._schedule()
+
+    @property
+    def depth(self):
+        """队列中等待发送的调用数"""
+        return len(self.pending_content) + len(self.pending_notifications)
+
+    def metrics(self):
+        """队列深度与延迟统计"""
+        stats = dict(self.stats)
+        stats["depth"] = self.depth
+        stats["latency_avg_ms"] = stats["latency_total_ms"] / stats["dispatched"] if stats["dispatched"] else 0.0
+        return stats
+
+    def _schedule(self):
+        if self.depth > self.stats["max_depth"]:
+            self.stats["max_depth"] = self.depth
+        if not self.timer.isActive():
+            wait = self.interval - (time.perf_counter() - self.last_flush) * 1000
+            self.timer.start(max(0, int(wait)))
+
+    def flush(self):
+        """发送所有内容更新和一条通知，剩余通知留到下一次"""
+        self.last_flush = time.perf_counter()
+        while self.pending_content:
+            widget_code, (title, content, enqueued_at) = self.pending_content.popitem(last=False)
+            delivered = self._dispatch(
+                enqueued_at,
+                self.method.change_widget_content,
+                widget_code=widget_code,
+                title=title,
+                content=content
+            )
+            if not delivered:
+                self.content_failed.emit(widget_code)
+        if self.pending_notifications:
+            kwargs, enqueued_at, retries = self.pending_notifications.popleft()
+            if not self._dispatch(enqueued_at, self.method.send_notification, **kwargs):
+                if retries < HOST_NOTIFICATION_RETRIES:
+                    self.pending_notifications.append((kwargs, enqueued_at, retries + 1))
+        if self.depth:
+            self._schedule()
+
+    def _dispatch(self, enqueued_at, func, **kwargs):
+        """调用宿主接口，返回是否成功"""
+        start = time.perf_counter()
+        delivered = True
+        try:
+            func(**kwargs)
+        except Exception as e:
+            print(f"调用宿主接口时出错: {e}")
+            delivered = False
+        finished = time.perf_counter()
+
+        stats = self.stats
+        stats["dispatched"] += 1
+        if not delivered:
+            stats["failed"] += 1
+        latency = (finished - enqueued_at) * 1000
+        stats["latency_total_ms"] += latency
+        stats["latency_max_ms"] = max(stats["latency_max_ms"], latency)
+        stats["call_max_ms"] = max(stats["call_max_ms"], (finished - start) * 1000)
+        return delivered
+
+
+class ResultWidgetController(QObject):
+    """结果小组件的状态机
+
+    状态：时间显示 -> 点名准备 -> 动画 -> 显示结果 -> 时间显示。
+    控制器记录自己最后一次写入的标题和内容，内容不变时不再调用宿主接口，
+    时间显示由对齐到整秒的单次计时器驱动，空闲时无需向宿主查询小组件状态。
+    """
+
+    IDLE_CLOCK = "idle_clock"
+    PREPARING = "preparing"
+    ANIMATING = "animating"
+    SHOWING_RESULT = "showing_result"
+
+    def __init__(self, method, widget_code, parent=None):
+        super().__init__(parent)
+        self.method = method
+        self.widget_code = widget_code
+        self.state = self.IDLE_CLOCK
+        self.generation = 0   # 状态或注册变化时加一
+        self.content = None   # 应显示的 (标题, 内容)
+        self.rendered = None  # 最后一次写入宿主的 (标题, 内容)
+
+        # 统计
+        self.started_at = time.monotonic()
+        self.host_calls = 0      # 实际发出的宿主调用
+        self.skipped_calls = 0   # 内容未变化而省去的 change_widget_content
+        self.avoided_probes = 0  # 旧的轮询方式在这段时间内会发出的查询
+
+        self.clock_timer = QTimer(self)
+        self.clock_timer.setSingleShot(True)
+        self.clock_timer.setTimerType(Qt.PreciseTimer)
+        self.clock_timer.timeout.connect(self._on_clock_tick)
+
+        self.result_timer = QTimer(self)
+        self.result_timer.setSingleShot(True)
+        self.result_timer.timeout.connect(self.show_clock)
+
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.refresh)
+
+    def register(self):
+        """向宿主注册小组件，注册后内容未知，下次必定重绘"""
+        self.method.register_widget(
+            widget_code=self.widget_code,
+            widget_name="随机点名结果",
+            widget_width=RESULT_WIDGET_WIDTH
+        )
+        self.host_calls += 1
+        self.rendered = None
+        self.generation += 1
+
+    def refresh(self):
+        """重新写入当前应显示的内容(小组件被宿主重建后调用)"""
+        self.rendered = None
+        if self.state == self.IDLE_CLOCK:
+            self.render(CLOCK_TITLE, datetime.now().strftime("%H:%M:%S"))
+        elif self.content:
+            self.render(*self.content)
+
+    def render(self, title, content):
+        """写入小组件内容，与上次相同时跳过"""
+        self.content = (title, content)
+        if self.rendered == (title, content):
+            self.skipped_calls += 1
+            return False
+        try:
+            self.method.change_widget_content(
+                widget_code=self.widget_code,
+                title=title,
+                content=content
+            )
+            self.host_calls += 1
+            self.rendered = (title, content)
+            return True
+        except Exception as e:
+            print(f"更新小组件时出错: {e}")
+            self.rendered = None
+            return False
+
+    def on_content_failed(self, widget_code):
+        """排队的内容更新未能送达宿主：清除已写入的记录，稍后重新写入当前内容"""
+        if widget_code != self.widget_code:
+            return
+        self.rendered = None
+        if not self.retry_timer.isActive():
+            self.retry_timer.start(HOST_RETRY_MS)
+
+    def set_state(self, state):
+        """切换状态，只有时间显示状态下时钟才运行"""
+        self.state = state
+        self.generation += 1
+        if state != self.SHOWING_RESULT:
+            self.result_timer.stop()
+        if state == self.IDLE_CLOCK:
+            self._on_clock_tick()
+        else:
+            self.clock_timer.stop()
+
+    def show_clock(self):
+        """恢复时间显示"""
+        self.set_state(self.IDLE_CLOCK)
+
+    def show_result(self, title, content, duration=RESULT_DISPLAY_MS):
+        """显示结果，duration 毫秒后恢复时间显示"""
+        self.set_state(self.SHOWING_RESULT)
+        self.render(title, content)
+        self.result_timer.start(duration)
+
+    def stop(self):
+        self.clock_timer.stop()
+        self.result_timer.stop()
+        self.retry_timer.stop()
+
+    def _on_clock_tick(self):
+        if self.state != self.IDLE_CLOCK:
+            return
+        self.avoided_probes += PROBE_CALLS_PER_TICK
+        self.render(CLOCK_TITLE, datetime.now().strftime("%H:%M:%S"))
+        # 对齐到下一个整秒
+        self.clock_timer.start(1000 - datetime.now().microsecond // 1000 + CLOCK_ALIGN_MS)
+
+    def saved_calls_per_minute(self):
+        """平均每分钟省去的宿主调用次数"""
+        minutes = max((time.monotonic() - self.started_at) / 60, 1 / 60)
+        return (self.skipped_calls + self.avoided_probes) / minutes
+
 
 class Plugin(PluginBase):
     def __init__(self, cw_contexts, method):
         super().__init__(cw_contexts, method)
         self.floating_window = None
-        self.result_widget_code = "random_name_result"
-        self.animation_timer = None
-        self.animation_count = 0
-        self.animation_max = 8
+        self.result_widget_code = RESULT_WIDGET_CODE
+        self.host = HostCallQueue(method)
+        self.widget_controller = ResultWidgetController(self.host, self.result_widget_code)
+        self.host.content_failed.connect(self.widget_controller.on_content_failed)
+        self.animation_max = WIDGET_ANIMATION_FRAMES
         self.final_name = ""
-        self.time_timer = None  # 用于时间更新的计时器
-        self.showing_name = False  # 是否正在显示点名结果
-        self.animation_active = False
-        self.lock_time_updates = False  # 添加全局锁定标志
+
+        # update() 的变化检测与耗时统计
+        self._synced_contexts = None
+        self._synced_signature = None
+        self._synced_generation = None
+        self._last_widget_check = 0.0
+        # 当前课程变化(下课或换课)时结束考勤
+        self._current_lesson = self._lesson(cw_contexts)
+        self.update_stats = {"calls": 0, "skipped": 0, "total_ms": 0.0, "max_ms": 0.0}
+        _plugin_instances[os.path.normcase(os.path.abspath(self.PATH))] = self
         self.init()
 
     def init(self):
@@ -398,274 +1597,199 @@ class Plugin(PluginBase):
             # 清理所有已存在的计时器
             self.__cleanup_timers()
             
-            # 重置所有状态变量
-            self.showing_name = False
-            self.animation_active = False
-            self.lock_time_updates = False
-            
-            # 首先注册小组件
-            self.method.register_widget(
-                widget_code=self.result_widget_code,
-                widget_name="随机点名结果",
-                widget_width=250
-            )
-            
-            # 立即更新初始时间
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.method.change_widget_content(
-                widget_code=self.result_widget_code,
-                title="当前时间",
-                content=current_time
-            )
+            # 首先注册小组件，并立即显示当前时间
+            self.widget_controller.register()
+            self.widget_controller.show_clock()
             
             # 创建悬浮窗
             if not self.floating_window:
                 self.floating_window = FloatingWindow()
                 self.floating_window.name_selected.connect(self.show_name_in_widget)
+                self.floating_window.names_selected.connect(self.show_names_in_widget)
             self.floating_window.show()
             
-            # 创建时间更新计时器，但确保只有一个
-            if not hasattr(self, 'time_timer') or not self.time_timer:
-                self.time_timer = QTimer()
-                self.time_timer.timeout.connect(self.update_time_display)
-            
-            # 启动计时器
-            if not self.time_timer.isActive():
-                self.time_timer.start(1000)
-            
         except Exception as e:
             print(f"插件初始化错误: {e}")
     
     def __cleanup_timers(self):
         """清理所有计时器，防止多实例干扰"""
-        if hasattr(self, 'time_timer') and self.time_timer:
-            if self.time_timer.isActive():
-                self.time_timer.stop()
-            self.time_timer = None
-        
-        if hasattr(self, 'animation_timer') and self.animation_timer:
-            if self.animation_timer.isActive():
-                self.animation_timer.stop()
-            self.animation_timer = None
+        self.widget_controller.stop()
+        animation_scheduler().cancel(self)
     
     def update_time_display(self):
-        """更新小组件显示当前时间，加强防干扰机制"""
-        # 更严格的状态检查，防止在点名过程中更新时间
-        if self.showing_name or self.animation_active:
-            return
-            
-        # 如果正在执行动画，也不更新
-        if hasattr(self, 'animation_timer') and self.animation_timer and self.animation_timer.isActive():
-            return
-            
-        try:
-            # 获取当前小组件状态
-            widget = self.method.get_widget(self.result_widget_code)
-            if not widget:
-                return
-                
-            # 检查当前标题，严格过滤点名相关标题
-            try:
-                current_title = widget.title()
-                current_content = widget.content()
-                
-                # 如果当前内容不是时间格式 (00:00:00)，可能是点名内容，不要更新
-                if current_title != "当前时间":
-                    return
-                    
-                # 如果当前在显示学生名字(非时间格式)，也不更新
-                time_format = r'\d{2}:\d{2}:\d{2}'
-                import re
-                if not re.match(time_format, current_content):
-                    return
-            except:
-                pass
-                
-            # 安全地更新时间
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.method.change_widget_content(
-                widget_code=self.result_widget_code,
-                title="当前时间",
-                content=current_time
-            )
-        except Exception as e:
-            print(f"时间更新错误: {e}")
+        """空闲时刷新时间显示"""
+        if self.widget_controller.state == ResultWidgetController.IDLE_CLOCK:
+            self.widget_controller.render(CLOCK_TITLE, datetime.now().strftime("%H:%M:%S"))
     
     def show_name_in_widget(self, name):
         """在小组件中显示点名结果"""
-        self.lock_time_updates = True  # 立即锁定时间更新
-        if hasattr(self, 'time_timer') and self.time_timer:
-            self.time_timer.stop()
-            
         self.final_name = name
-        self.showing_name = True  # 标记正在显示点名结果
-        self.animation_active = True  # 确保设置动画状态
+        self.widget_controller.set_state(ResultWidgetController.PREPARING)
         
         # 开始动画效果
         self.start_name_animation()
     
+    def show_names_in_widget(self, names):
+        """在小组件中显示批量点名结果"""
+        self.show_name_in_widget("、".join(names))
+
     def start_name_animation(self):
-        """开始名字切换动画，强化状态控制"""
+        """开始名字切换动画，点名过程中再次点名会重新开始动画"""
         try:
-            # 双重保险：再次确保时间计时器停止
-            if hasattr(self, 'time_timer') and self.time_timer and self.time_timer.isActive():
-                self.time_timer.stop()
-                
-            # 设置全局标志变量
-            self.animation_active = True
-            self.showing_name = True
-            
-            # 显式强制更新状态
-            self.method.change_widget_content(
-                widget_code=self.result_widget_code,
-                title="点名准备中...",
-                content="请稍候..."
-            )
+            self.widget_controller.render("点名准备中...", "请稍候...")
             
             names = self.floating_window.names
             if not names:
-                self.method.change_widget_content(
-                    widget_code=self.result_widget_code,
-                    title="错误",
-                    content="名单为空"
-                )
+                animation_scheduler().cancel(self)
                 # 短暂显示错误后恢复时间显示
-                QTimer.singleShot(3000, self.reset_to_time_display)
+                self.widget_controller.show_result("错误", "名单为空", 3000)
                 return
             
-            self.animation_count = 0
-            
-            # 清理已有的动画计时器
-            if self.animation_timer:
-                if self.animation_timer.isActive():
-                    self.animation_timer.stop()
-            
-            # 创建新的动画计时器
-            self.animation_timer = QTimer()
-            self.animation_timer.timeout.connect(self.update_animation)
-            self.animation_timer.start(80)
+            self.widget_controller.set_state(ResultWidgetController.ANIMATING)
+            due_times, frames = build_frames(names, self.final_name, self.animation_max)
+            animation_scheduler().start(self, due_times, frames, self.update_animation)
         except Exception as e:
             print(f"动画启动错误: {e}")
             self.reset_to_time_display()
     
-    def update_animation(self):
-        """更新动画显示，保持状态变量正确"""
-        # 重申状态，防止被其他方法改变
-        self.showing_name = True
-        self.animation_active = True
+    def update_animation(self, name, is_last):
+        """更新动画显示"""
+        if not is_last:
+            self.widget_controller.render("点名中...", name)
+            return
+
+        # 动画结束，显示最终结果，10秒后恢复时间显示
+        self.widget_controller.show_result("点名结果", name)
         
-        if self.animation_count < self.animation_max:
-            # 随机显示一个名字
-            temp_name = random.choice(self.floating_window.names)
-            self.method.change_widget_content(
-                widget_code=self.result_widget_code,
-                title="点名中...",
-                content=temp_name
-            )
-            self.animation_count += 1
-            # 逐渐减慢动画速度
-            delay = 80 + int(self.animation_count * 20)
-            self.animation_timer.start(delay)
-        else:
-            # 动画结束，显示最终结果
-            self.animation_timer.stop()
-            
-            # 更新小组件显示
-            self.method.change_widget_content(
-                widget_code=self.result_widget_code,
-                title="点名结果",
-                content=self.final_name
-            )
-            
-            # 发送通知
-            self.method.send_notification(
-                state=4,
-                title="随机点名",
-                subtitle="已选中学生",
-                content=f"恭喜{self.final_name}同学被点到！",
-                duration=5000
-            )
-            
-            # 设置结果显示计时器，10秒后恢复时间显示
-            QTimer.singleShot(10000, self.reset_to_time_display)
+        # 发送通知(排队发送，不阻塞动画)
+        self.host.send_notification(
+            state=4,
+            title="随机点名",
+            subtitle="已选中学生",
+            content=f"恭喜{name}同学被点到！",
+            duration=5000
+        )
     
     def reset_to_time_display(self):
-        """重置为时间显示，确保状态正确恢复"""
-        # 重置状态变量
-        self.showing_name = False
-        self.animation_active = False
-        
-        # 停止任何可能仍在运行的动画计时器
-        if hasattr(self, 'animation_timer') and self.animation_timer:
-            if self.animation_timer.isActive():
-                self.animation_timer.stop()
-        
-        # 重新启动时间计时器
-        if hasattr(self, 'time_timer') and self.time_timer:
-            if not self.time_timer.isActive():
-                self.time_timer.start(1000)
-        
-        # 立即更新为当前时间
-        try:
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.method.change_widget_content(
-                widget_code=self.result_widget_code,
-                title="当前时间",
-                content=current_time
-            )
-        except Exception as e:
-            print(f"重置时间显示时出错: {e}")
-        self.lock_time_updates = False  # 解除锁定
+        """重置为时间显示"""
+        # 停止任何可能仍在运行的动画
+        animation_scheduler().cancel(self)
+        self.widget_controller.show_clock()
 
     def update(self, cw_contexts):
-        """增强的状态更新函数，确保小组件在各种情况下都能正常显示"""
+        """宿主定时调用；cw_contexts、小组件和插件状态都未变化时直接返回"""
+        start = time.perf_counter()
         super().update(cw_contexts)
-        
-        # 如果时间更新被锁定，确保时间计时器停止
-        if self.lock_time_updates and hasattr(self, 'time_timer') and self.time_timer and self.time_timer.isActive():
-            self.time_timer.stop()
-        
-        # 如果显示名字或动画活跃，锁定时间更新
-        if self.showing_name or self.animation_active:
-            self.lock_time_updates = True
-        else:
-            self.lock_time_updates = False
-        
         try:
-            # 先检查小组件是否存在，不存在则重新注册
-            widget = self.method.get_widget(self.result_widget_code)
-            if not widget:
-                print("小组件不存在，重新注册...")
-                self.method.register_widget(
-                    widget_code=self.result_widget_code,
-                    widget_name="随机点名结果",
-                    widget_width=250
-                )
-                # 确保重新注册后检查其内容
-                widget = self.method.get_widget(self.result_widget_code)
-            
-            # 确保在不显示点名结果时保持时间更新
-            if not self.showing_name and widget:
-                try:
-                    widget_title = widget.title()
-                    if widget_title != "点名中..." and widget_title != "点名结果":
-                        self.update_time_display()
-                except:
-                    self.update_time_display()
-            
-            # 始终确保小组件宽度足够
+            lesson = self._lesson(cw_contexts)
+            if lesson != self._current_lesson:
+                self._current_lesson = lesson
+                if self.floating_window:
+                    self.floating_window.end_attendance_session()
+            if self._needs_sync(cw_contexts):
+                self._sync_widget()
+            else:
+                self.update_stats["skipped"] += 1
+        except Exception as e:
+            print(f"更新状态时出错: {e}")
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            stats = self.update_stats
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed
+            if elapsed > stats["max_ms"]:
+                stats["max_ms"] = elapsed
+
+    @staticmethod
+    def _lesson(cw_contexts):
+        """宿主提供的当前课程，未提供时为 None"""
+        if isinstance(cw_contexts, dict):
+            return cw_contexts.get("Current_Lesson")
+        return None
+
+    def _needs_sync(self, cw_contexts):
+        """判断本次 update 是否需要与宿主同步"""
+        if self.widget_controller.generation != self._synced_generation:
+            return True
+        if time.monotonic() - self._last_widget_check >= WIDGET_CHECK_INTERVAL:
+            return True
+        if cw_contexts is self._synced_contexts:
+            return False
+        return contexts_signature(cw_contexts) != self._synced_signature
+
+    def _sync_widget(self):
+        """确认小组件存在，不存在则重新注册并恢复内容和宽度"""
+        widget = self.method.get_widget(self.result_widget_code)
+        registered = not widget
+        if registered:
+            print("小组件不存在，重新注册...")
+            self.widget_controller.register()
+            self.widget_controller.refresh()
+
+        # 首次同步或重新注册后确保小组件宽度足够
+        if registered or self._synced_generation is None:
             self.method.adjust_widget_width(
                 widget_code=self.result_widget_code,
-                width=250
+                width=RESULT_WIDGET_WIDTH
             )
-        except Exception as e:
-            print(f"更新状态时出错: {e}")
+
+        self._synced_contexts = self.cw_contexts
+        self._synced_signature = contexts_signature(self.cw_contexts)
+        self._synced_generation = self.widget_controller.generation
+        self._last_widget_check = time.monotonic()
+
+
+def load_form_class(ui_path):
+    """返回 .ui 文件编译后的界面类(Ui_Form)
+
+    编译出的 Python 代码按 .ui 文件内容的 SHA-1 缓存在同目录的隐藏文件中，
+    同一进程内再按 mtime 与大小缓存界面类；.ui 文件修改后自动重新编译。
+    """
+    stat = os.stat(ui_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _form_classes.get(ui_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(ui_path, "rb") as f:
+        ui_bytes = f.read()
+    header = f"# {FORM_CACHE_TAG} {hashlib.sha1(ui_bytes).hexdigest()}\n"
+    cache_path = cache_path_for(ui_path)
+    source = None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            if f.readline() == header:
+                source = f.read()
+    except OSError:
+        pass
+
+    if source is None:
+        from PyQt5 import uic
+
+        buffer = io.StringIO()
+        uic.compileUi(io.BytesIO(ui_bytes), buffer)
+        source = buffer.getvalue()
+        try:
+            atomic_write(cache_path, (header + source).encode("utf-8"))
+        except OSError as e:
+            print(f"写入设置界面缓存时出错: {e}")
+
+    namespace = {}
+    exec(compile(source, cache_path, "exec"), namespace)
+    form_class = next(value for name, value in namespace.items()
+                      if name.startswith("Ui_") and isinstance(value, type))
+    _form_classes[ui_path] = (stamp, form_class)
+    return form_class
 
 
 class Settings(SettingsBase):
     def __init__(self, plugin_path, parent=None):
         super().__init__(plugin_path, parent)
-        uic.loadUi(os.path.join(self.PATH, "settings.ui"), self)
+        from qfluentwidgets import PrimaryPushButton, PushButton, ComboBox
+
+        # 使用缓存的编译结果，不必每次打开设置页都解析 settings.ui
+        self.form = load_form_class(os.path.join(self.PATH, "settings.ui"))()
+        self.form.setupUi(self)
         open_names_list = self.findChild(PrimaryPushButton, "open_names_list")
         open_names_list.clicked.connect(self.open_names_file)
         
@@ -678,10 +1802,33 @@ class Settings(SettingsBase):
         self.prob_btn = self.findChild(PushButton, "probability_settings")
         if self.prob_btn:
             self.prob_btn.clicked.connect(self.show_probability_settings)
+
+        # 导入名单按钮
+        self.import_btn = self.findChild(PushButton, "import_names")
+        if self.import_btn:
+            self.import_btn.clicked.connect(self.import_names)
+
+        # 抽取模式选择
+        self.config = get_config(self.PATH, CONFIG_FILE, DEFAULT_CONFIG)
+        self.mode_box = self.findChild(ComboBox, "draw_mode")
+        if self.mode_box:
+            modes = [mode for mode, _ in DRAW_MODE_LABELS]
+            for mode, label in DRAW_MODE_LABELS:
+                self.mode_box.addItem(label, userData=mode)
+            current_mode = self.config["draw_mode"]
+            self.mode_box.setCurrentIndex(modes.index(current_mode) if current_mode in modes else 0)
+            self.mode_box.currentIndexChanged.connect(self.change_draw_mode)
         
     def open_names_file(self):
         """打开名单文件进行编辑"""
-        file_path = os.path.join(self.PATH, "names.txt")
+        import platform
+        import subprocess
+
+        store = self.current_store()
+        if not isinstance(store.source, TextRosterSource):
+            print("当前使用 SQLite 存储名单，请在概率设置中编辑，或用 python -m core.database 导入导出")
+            return
+        file_path = store.file_path
         if platform.system() == "Windows":
             os.startfile(file_path)
         elif platform.system() == "Linux":
@@ -689,52 +1836,112 @@ class Settings(SettingsBase):
         elif platform.system() == "Darwin":
             subprocess.call(["open", file_path])
 
-    def show_history(self):
-        """显示点名历史记录"""
-        history_dialog = QDialog(self)
-        history_dialog.setWindowTitle("点名历史记录")
-        history_dialog.resize(300, 400)
-        
-        layout = QVBoxLayout(history_dialog)
-        
-        # 从主窗口获取历史记录
-        floating_window = None
+    def change_draw_mode(self, index):
+        """保存抽取模式并应用到所有共享名单仓库"""
+        mode = DRAW_MODE_LABELS[index][0]
         plugin_instance = self.findPlugin()
         if plugin_instance and plugin_instance.floating_window:
-            floating_window = plugin_instance.floating_window
-        
-        if floating_window and hasattr(floating_window, 'selected_history'):
-            history = floating_window.selected_history
-            if history:
-                for i, name in enumerate(reversed(history), 1):
-                    item_label = QLabel(f"{i}. {name}")
-                    item_label.setFont(QFont("微软雅黑", 12))
-                    layout.addWidget(item_label)
-            else:
-                layout.addWidget(QLabel("暂无点名记录"))
-        else:
-            layout.addWidget(QLabel("无法获取点名记录"))
-            
-        close_btn = PushButton("关闭")
-        close_btn.clicked.connect(history_dialog.close)
-        layout.addWidget(close_btn, alignment=Qt.AlignCenter)
-        
+            plugin_instance.floating_window.set_draw_mode(mode)
+            return
+        self.config["draw_mode"] = mode
+        set_all_draw_modes(mode)
+
+    def current_store(self):
+        """悬浮窗当前班级的名单仓库(名单在需要时才读取，构建设置页时不读取)"""
+        plugin_instance = self.findPlugin()
+        if plugin_instance and plugin_instance.floating_window:
+            return plugin_instance.floating_window.store
+        self.config.update_config()
+        return roster_store(self.config["current_class"] or DEFAULT_CLASS, self.PATH,
+                            self.config["storage"] or STORAGE_TEXT)
+
+    def show_history(self):
+        """显示点名历史记录"""
+        # 历史记录与悬浮窗共享同一份，插件未运行时直接读取日志
+        history_dialog = HistoryDialog(get_history(history_file_path(self.PATH)), self)
         history_dialog.exec_()
         
     def findPlugin(self):
         """查找插件实例"""
-        # 这需要在实际环境中实现
-        return None  # 占位符
+        return _plugin_instances.get(os.path.normcase(os.path.abspath(self.PATH)))
 
     def show_probability_settings(self):
         """显示概率设置对话框"""
-        dialog = ProbabilitySettingDialog(self)
-        if dialog.exec_() == QDialog.Accepted:
-            # 如果设置被保存，刷新插件实例
-            plugin_instance = self.findPlugin()
-            if plugin_instance and plugin_instance.floating_window:
-                plugin_instance.floating_window.load_names()
+        # 保存后由名单仓库通知所有组件，无需再手动刷新插件实例
+        store = self.current_store()
+        store.ensure_loaded()
+        dialog = ProbabilitySettingDialog(store, self)
+        dialog.exec_()
+
+    def import_names(self):
+        """从 CSV、Excel 或文本文件导入当前班级的名单(在后台线程读取)"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "导入名单", "", "名单文件 (*.csv *.txt *.xlsx *.xlsm);;所有文件 (*)"
+        )
+        if not path:
+            return
 
+        box = QMessageBox(QMessageBox.Question, "导入名单", "将导入的学生追加到当前名单，还是替换当前名单？", parent=self)
+        append_btn = box.addButton("追加", QMessageBox.AcceptRole)
+        replace_btn = box.addButton("替换", QMessageBox.DestructiveRole)
+        box.addButton("取消", QMessageBox.RejectRole)
+        box.exec_()
+        if box.clickedButton() not in (append_btn, replace_btn):
+            return
+        append = box.clickedButton() is append_btn
+
+        store = self.current_store()
+        store.ensure_loaded()
+        importer = RosterImporter(path, existing_names=list(store.names) if append else ())
+        self.import_task = RosterImportTask(importer)
+
+        progress = QProgressDialog("正在导入名单...", "取消", 0, 100, self)
+        progress.setWindowTitle("导入名单")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(300)
+        progress.canceled.connect(self.import_task.cancel)
+        self.import_task.signals.progress.connect(progress.setValue)
+        self.import_task.signals.failed.connect(
+            lambda message: QMessageBox.warning(self, "导入名单", f"导入失败：{message}")
+        )
+        self.import_task.signals.finished.connect(
+            lambda names_data: self.on_import_finished(store, importer, names_data, append, progress)
+        )
+        QThreadPool.globalInstance().start(self.import_task)
+
+    def on_import_finished(self, store, importer, names_data, append, progress):
+        """导入完成后一次性保存到名单仓库
+
+        没有导入任何学生时(只有表头、列识别错误或全部无效/重复)不修改名单；
+        替换名单前显示统计信息并确认。
+        """
+        progress.close()
+        if names_data is None:
+            return
+        summary = self.import_summary(importer.stats)
+        if not names_data:
+            QMessageBox.warning(self, "导入名单", f"没有可导入的学生，名单未修改。\n{summary}")
+            return
+        if append:
+            names_data = [list(item) for item in store.names_data] + names_data
+        else:
+            answer = QMessageBox.question(
+                self, "导入名单",
+                f"将用导入的 {len(names_data)} 人替换当前名单(共 {len(store.names_data)} 人)，是否继续？\n{summary}",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                return
+        store.save(names_data)
+        QMessageBox.information(self, "导入名单", summary)
+
+    @staticmethod
+    def import_summary(stats):
+        return (
+            f"已导入 {stats['imported']} 人（编码：{stats['encoding']}）\n"
+            f"跳过重复 {stats['duplicates']} 人，无效 {stats['invalid']} 行，"
+            f"概率等级无法识别 {stats['bad_tiers']} 行(按普通处理)"
+        )
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,22 @@
+"""core 不依赖 Qt，测试以顶层包 core 导入，不导入插件本身(插件的 __init__ 需要 Qt 与宿主)"""
+import os
+import sys
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_DIR)
+
+
+class PluginDirectory:
+    """把插件目录按普通目录收集，pytest 不再为其执行 __init__.py"""
+
+    @staticmethod
+    def pytest_collect_directory(path, parent):
+        if str(path) == PLUGIN_DIR:
+            return pytest.Dir.from_parent(parent, path=path)
+        return None
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(PluginDirectory(), "classroll-plugin-directory")
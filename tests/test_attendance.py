@@ -0,0 +1,136 @@
+import random
+from collections import Counter
+
+from core.sampler import FairSampler, WeightedPool
+from core.store import RosterStore
+
+
+def draw_counts(pool, count):
+    return Counter(pool.draw_index() for _ in range(count))
+
+
+def make_store(tmp_path, text="甲,3\n乙,3\n丙,3\n"):
+    path = tmp_path / "names.txt"
+    path.write_text(text, encoding="utf-8")
+    return RosterStore(str(path))
+
+
+def test_pool_masked_students_are_skipped_and_keep_their_count():
+    weights = [1, 2, 3, 0, 4]
+    pool = WeightedPool(list("abcde"), weights, random.Random(2))
+    table = pool.table
+    pool.set_masked(1, True)
+    pool.set_masked(4, True)
+    # 切换屏蔽不重建别名表
+    assert pool.table is table and not pool.stale
+    assert len(pool) == 4
+
+    counts = draw_counts(pool, 4)
+    assert counts == {0: 1, 2: 3}
+
+    # 出勤学生本轮已抽完：恢复后只剩回来的学生
+    pool.set_masked(4, False)
+    assert draw_counts(pool, 4) == {4: 4}
+
+
+def test_pool_student_returning_after_rebuild_is_drawn_from_extra_set():
+    pool = WeightedPool(list("abc"), [3, 3, 3], random.Random(3))
+    pool.set_masked(2, True)
+    pool._rebuild()  # 别名表在 c 缺勤时构建
+    assert pool.table_weights[2] == 0
+    first = pool.draw_index()
+
+    pool.set_masked(2, False)
+    assert pool.extra == {2: True} and pool.extra_remaining == 3
+
+    counts = draw_counts(pool, 8)
+    counts[first] += 1
+    assert [counts[i] for i in range(3)] == [3, 3, 3]
+    assert pool.extra_remaining == 0
+
+
+def test_pool_masking_everyone_returns_none():
+    pool = WeightedPool(["a", "b"], [1, 1], random.Random(4))
+    pool.set_masked(0, True)
+    pool.set_masked(1, True)
+    assert pool.draw() is None
+
+
+def test_pool_set_weight_and_append_keep_masked_totals():
+    pool = WeightedPool(list("ab"), [2, 2], random.Random(5))
+    pool.set_masked(1, True)
+    pool.set_weight(1, 5)
+    assert (pool.total, pool.masked_total, len(pool)) == (7, 5, 2)
+    pool.append("c", 1)
+    pool.set_masked(1, False)
+    assert draw_counts(pool, 8) == {0: 2, 1: 5, 2: 1}
+
+
+def test_fair_sampler_masking_excludes_student():
+    sampler = FairSampler(list("abcd"), [1, 1, 1, 1], rng=random.Random(6))
+    sampler.set_masked(0, True)
+    assert len(sampler) == 3
+    assert 0 not in draw_counts(sampler, 200)
+    sampler.set_masked(0, False)
+    sampler.reset()
+    assert len(sampler) == 4
+    assert 0 in draw_counts(sampler, 200)
+
+
+def test_pool_unmasking_student_appended_since_rebuild():
+    pool = WeightedPool(list("ab"), [1, 1], random.Random(10))
+    pool.append("c", 2)
+    pool.set_masked(2, True)
+    pool.set_masked(2, False)
+    assert not pool.extra
+    assert draw_counts(pool, 4) == {0: 1, 1: 1, 2: 2}
+
+
+def test_absent_students_are_not_drawn_and_version_is_unchanged(tmp_path):
+    store = make_store(tmp_path)
+    version = store.version
+    notified = []
+    store.subscribe(notified.append)
+
+    store.set_absent("乙")
+    assert store.version == version and notified == [store]
+    assert "乙" not in Counter(store.draw() for _ in range(60))
+    assert "乙" not in store.draw_distinct(3)
+
+    store.end_attendance()
+    assert not store.absent
+    assert store.version == version
+
+
+def test_absence_survives_sampler_rebuild_and_drops_removed_names(tmp_path):
+    store = make_store(tmp_path)
+    store.set_absent("乙")
+    store.set_draw_mode("fair")
+    assert "乙" not in Counter(store.draw() for _ in range(60))
+
+    store.apply_names([["甲", 3], ["丙", 3]])
+    assert not store.absent
+    store.apply_names([["甲", 3], ["乙", 3], ["丙", 3]])
+    assert "乙" in Counter(store.draw() for _ in range(60))
+
+
+def test_absent_absolute_student_releases_the_others(tmp_path):
+    store = make_store(tmp_path, "甲,5\n乙,3\n丙,1\n")
+    assert set(store.draw() for _ in range(20)) == {"甲"}
+
+    store.set_absent("甲")
+    assert set(store.draw() for _ in range(20)) == {"乙"}
+    assert store.draw_distinct(3) == ["乙"]
+
+    store.set_absent("甲", False)
+    assert set(store.draw() for _ in range(20)) == {"甲"}
+
+    store.set_absent("乙")
+    store.set_absent("甲")
+    # 出勤学生的权重都为0时每人权重为1
+    assert set(store.draw() for _ in range(20)) == {"丙"}
+    store.set_absent("乙", False)
+    assert set(store.draw() for _ in range(20)) == {"乙"}
+
+    store.end_attendance()
+    assert set(store.draw() for _ in range(20)) == {"甲"}
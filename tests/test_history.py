@@ -0,0 +1,45 @@
+from core.history import KIND_NAME, DrawHistory
+
+
+def test_compacted_log_reloads_without_recounting(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    history = DrawHistory(path, limit=3, compact_lines=2)
+    history.record_many(["甲", "乙", "甲", "丙", "甲"])
+    history.record_teams([[["甲", 3], ["乙", 3]]])
+    history.record("乙")
+    history.close()
+
+    reloaded = DrawHistory(path, limit=3)
+    assert reloaded.counts == {"甲": 3, "乙": 2, "丙": 1}
+    assert reloaded.seq == history.seq
+    assert [entry[3] for entry in reloaded.recent] == [entry[3] for entry in history.recent]
+
+
+def test_half_written_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    history = DrawHistory(path)
+    history.record_many(["甲", "乙"])
+    history.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 3, "time": 1.0, "kind": "na')
+
+    reloaded = DrawHistory(path)
+    assert reloaded.counts == {"甲": 1, "乙": 1}
+    assert reloaded.page(0, 10)[0][2:] == (KIND_NAME, "乙")
+
+
+def test_records_after_half_written_line_survive_reload(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    history = DrawHistory(path)
+    history.record_many(["甲", "乙"])
+    history.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 3, "time": 1.0, "kind": "na')
+
+    history = DrawHistory(path)
+    history.record("丙")
+    history.record("丁")
+    history.close()
+
+    reloaded = DrawHistory(path)
+    assert reloaded.counts == {"甲": 1, "乙": 1, "丙": 1, "丁": 1}
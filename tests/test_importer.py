@@ -0,0 +1,11 @@
+from core.importer import RosterImporter
+
+
+def test_names_with_commas_or_newlines_are_invalid(tmp_path):
+    path = tmp_path / "names.csv"
+    path.write_text('姓名,概率\n"甲,乙",3\n"丙\n丁",2\n戊,4\n', encoding="utf-8")
+
+    importer = RosterImporter(str(path))
+    assert importer.run() == [["戊", 4]]
+    assert importer.stats["invalid"] == 2
+    assert importer.stats["imported"] == 1
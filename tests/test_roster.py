@@ -0,0 +1,35 @@
+import os
+
+from core.roster import _read_cache, cache_path_for, load_roster, save_roster
+
+
+def test_dirty_rows_patch_cache_in_place(tmp_path):
+    path = str(tmp_path / "names.txt")
+    save_roster(path, [["甲", 3], ["乙", 3], ["丙", 2]])
+
+    stats = save_roster(path, [["甲", 3], ["乙", 5], ["丙", 1]], dirty_rows={1, 2})
+    assert stats["cache_patched"]
+
+    cached = _read_cache(cache_path_for(path), os.stat(path))
+    assert cached is not None
+    assert cached.to_list() == [["甲", 3], ["乙", 5], ["丙", 1]]
+
+
+def test_stale_cache_is_rewritten_instead_of_patched(tmp_path):
+    path = str(tmp_path / "names.txt")
+    save_roster(path, [["甲", 3], ["乙", 3]])
+    with open(path, "ab") as f:
+        f.write("丙,4\n".encode("utf-8"))  # 外部修改，缓存失效
+
+    stats = save_roster(path, [["甲", 1], ["乙", 3]], dirty_rows={0})
+    assert not stats["cache_patched"]
+    assert load_roster(path).to_list() == [["甲", 1], ["乙", 3]]
+
+
+def test_cache_is_rewritten_when_row_order_differs(tmp_path):
+    path = str(tmp_path / "names.txt")
+    save_roster(path, [["A", 3], ["B", 3], ["C", 3]])
+    # 按旧的行号改写时，缓存中的名字顺序与新名单不同
+    stats = save_roster(path, [["C", 5], ["B", 3], ["A", 3]], dirty_rows={0})
+    assert not stats["cache_patched"]
+    assert load_roster(path).to_list() == [["C", 5], ["B", 3], ["A", 3]]
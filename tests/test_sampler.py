@@ -0,0 +1,43 @@
+import random
+from collections import Counter
+
+from core.sampler import FenwickTree, WeightedPool, draw_distinct
+
+
+def draw_counts(pool, count):
+    return Counter(pool.draw_index() for _ in range(count))
+
+
+def test_pool_round_draws_each_student_weight_times():
+    weights = [1, 2, 3, 0, 4]
+    pool = WeightedPool(list("abcde"), weights, random.Random(1))
+    # 多轮抽取会经过"剩余次数减半"的重建
+    counts = draw_counts(pool, 3 * sum(weights))
+    assert [counts[i] for i in range(5)] == [3 * w for w in weights]
+
+
+def test_fenwick_append_matches_prefix_sums():
+    weights = [3.0, 0.0, 1.0]
+    tree = FenwickTree(weights)
+    for weight in [2.0, 5.0, 0.0, 4.0, 1.0, 6.0]:
+        tree.append(weight)
+        weights.append(weight)
+    tree.update(4, 0.5)
+    weights[4] = 0.5
+    for count in range(len(weights) + 1):
+        assert tree.prefix(count) == sum(weights[:count])
+    for index, weight in enumerate(weights):
+        if weight:
+            assert tree.find(sum(weights[:index])) == index
+
+
+def test_draw_distinct_follows_absolute_rule():
+    names_data = [["a", 5], ["b", 3], ["c", 5], ["d", 4]]
+    assert sorted(draw_distinct(names_data, 3, random.Random(7))) == ["a", "c"]
+    assert len(draw_distinct(names_data, 1, random.Random(7))) == 1
+
+
+def test_draw_distinct_skips_impossible_students():
+    names_data = [["a", 1], ["b", 3], ["c", 2]]
+    assert sorted(draw_distinct(names_data, 3, random.Random(8))) == ["b", "c"]
+    assert sorted(draw_distinct([["a", 1], ["b", 1]], 2, random.Random(9))) == ["a", "b"]
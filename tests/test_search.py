@@ -0,0 +1,9 @@
+from core.search import NameSearchIndex
+
+
+def test_prefix_search_is_case_insensitive():
+    index = NameSearchIndex(["张三", "张四", "Tom", "tony", "李华"])
+    assert index.search("张") == {0, 1}
+    assert index.search("TO") == {2, 3}
+    assert index.search("  tom ") == {2}
+    assert index.search("王") == set()
@@ -0,0 +1,27 @@
+import random
+
+from core import simulation
+from core.simulation import simulate_pool
+
+
+def test_frequencies_are_exact_and_coverage_is_bounded():
+    names_data = [["甲", 2], ["乙", 3], ["丙", 4], ["丁", 1]]
+    result = simulate_pool(names_data, draws=100, rng=random.Random(1))
+    assert result["round_size"] == 100
+    assert result["frequencies"] == [10.0, 30.0, 60.0, 0.0]
+    assert result["eligible"] == 3
+    assert 3 <= result["coverage_mean"] <= result["round_size"]
+
+
+def test_coverage_is_round_size_when_everyone_has_one_ticket():
+    names_data = [[str(i), 1] for i in range(5)]
+    result = simulate_pool(names_data, trials=20, rng=random.Random(2))
+    assert result["coverage_mean"] == result["coverage_p90"] == 5
+
+
+def test_python_simulation_work_is_capped():
+    names_data = [[str(i), 3] for i in range(20000)]
+    result = simulate_pool(names_data, rng=random.Random(3))
+    assert not result["vectorized"]
+    assert result["trials"] * result["eligible"] <= max(simulation.PYTHON_SIMULATION_KEYS, result["eligible"])
+    assert result["frequencies"][0] == 100 * 30 / result["round_size"]
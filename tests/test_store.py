@@ -0,0 +1,24 @@
+from core.store import RosterStore
+
+
+def make_store(tmp_path, text="甲,3\n乙,3\n丙,3\n"):
+    path = tmp_path / "names.txt"
+    path.write_text(text, encoding="utf-8")
+    return RosterStore(str(path))
+
+
+def test_reorder_replaces_names_without_touching_sampler(tmp_path):
+    store = make_store(tmp_path)
+    sampler = store.sampler
+    version = store.version
+
+    diff = store.apply_names([["丙", 3], ["乙", 3], ["甲", 3]])
+    assert diff == ([], [], [])
+    assert store.names == ["丙", "乙", "甲"]
+    assert store.names_data[0] == ["丙", 3]
+    assert store.version == version + 1
+    assert store.sampler is sampler
+
+    # 顺序相同时不通知
+    store.apply_names([["丙", 3], ["乙", 3], ["甲", 3]])
+    assert store.version == version + 1